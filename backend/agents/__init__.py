@@ -6,7 +6,7 @@ from .inventory_agent import InventoryAgent
 from .fulfillment_agent import FulfillmentAgent
 from .policy_agent import PolicyAgent
 from .refill_prediction_agent import RefillPredictionAgent
-from .orchestrator_agent import OrchestratorAgent
+from .orchestrator_agent import OrchestratorAgent, get_orchestrator
 from .vision_pill_identifier_agent import VisionPillIdentifierAgent
 
 __all__ = [
@@ -16,5 +16,6 @@ __all__ = [
     "PolicyAgent",
     "RefillPredictionAgent",
     "OrchestratorAgent",
+    "get_orchestrator",
     "VisionPillIdentifierAgent",
 ]
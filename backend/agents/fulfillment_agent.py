@@ -11,7 +11,6 @@ import httpx
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 
-from openai import AsyncOpenAI
 from langchain_openai import ChatOpenAI
 
 from models.schemas import (
@@ -19,6 +18,7 @@ from models.schemas import (
     OrderConfirmationData, OrderPreviewData, OrderPreviewItem
 )
 from utils.tracing import agent_trace, get_trace_id, create_non_traced_llm
+from services.http_clients import get_openai_client
 
 
 # ============ MODEL CONFIG ============
@@ -39,13 +39,19 @@ class FulfillmentAgent:
         self.agent_name = "FulfillmentAgent"
         self.model_name = model_name
         self.temperature = temperature
-        # Direct OpenAI client for LLM calls
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        # Legacy LangChain LLM (for compatibility)
-        self.llm = create_non_traced_llm(model_name, temperature)
         self._data_service = None
         self._orders: Dict[str, dict] = {}
 
+    @property
+    def client(self):
+        """Shared OpenAI client, looked up per call so a closed pool is never reused"""
+        return get_openai_client()
+
+    @property
+    def llm(self):
+        """Legacy non-traced LangChain LLM (memoized per model/temperature)"""
+        return create_non_traced_llm(self.model_name, self.temperature)
+
     def set_data_service(self, data_service):
         """Inject data service"""
         self._data_service = data_service
@@ -446,7 +452,7 @@ class FulfillmentAgent:
         # Trigger WhatsApp Notification (Non-blocking)
         if patient_phone:
             try:
-                from services.whatsapp_service import send_order_confirmation_whatsapp
+                from services.whatsapp_service import queue_order_confirmation_whatsapp
                 # Use the order confirmation object as snapshot - preserve item order
                 order_snapshot = {
                     "order_id": order_id,
@@ -455,7 +461,7 @@ class FulfillmentAgent:
                     "delivery_estimate": order_confirmation.estimated_delivery
                 }
                 print(f"📲 Triggering WhatsApp for {patient_phone}")
-                send_order_confirmation_whatsapp(patient_phone, patient_name, order_snapshot)
+                queue_order_confirmation_whatsapp(patient_phone, patient_name, order_snapshot)
             except Exception as e:
                 print(f"⚠️ WhatsApp notification failed (non-blocking): {e}")
         
@@ -5,17 +5,16 @@ EMITS STANDARDIZED OUTPUT: {agent, decision, reason, evidence, message, next_age
 Uses: gpt-5-mini (fast for inventory lookups)
 """
 
-import os
 import json
 from typing import Optional, Dict, Any, List
 
-from openai import AsyncOpenAI
 from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from models.schemas import Decision, AgentOutput, Medicine
 from utils.tracing import agent_trace, get_trace_id, create_non_traced_llm
+from services.http_clients import get_openai_client
 
 
 # ============ MODEL CONFIG ============
@@ -36,12 +35,18 @@ class InventoryAgent:
         self.agent_name = "InventoryAgent"
         self.model_name = model_name
         self.temperature = temperature
-        # Direct OpenAI client for LLM calls
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        # Legacy LangChain LLM (for compatibility)
-        self.llm = create_non_traced_llm(model_name, temperature)
         self._data_service = None
 
+    @property
+    def client(self):
+        """Shared OpenAI client, looked up per call so a closed pool is never reused"""
+        return get_openai_client()
+
+    @property
+    def llm(self):
+        """Legacy non-traced LangChain LLM (memoized per model/temperature)"""
+        return create_non_traced_llm(self.model_name, self.temperature)
+
     def set_data_service(self, data_service):
         """Inject data service"""
         self._data_service = data_service
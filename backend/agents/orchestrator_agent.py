@@ -6,6 +6,8 @@ All agents emit standardized output: {agent, decision, reason, evidence, message
 
 import os
 import json
+import asyncio
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
 
 from langchain_openai import ChatOpenAI
@@ -471,6 +473,23 @@ class OrchestratorAgent:
             prescription_upload_data=prescription_upload_data
         )
     
+    async def process_requests(
+        self,
+        requests: List[OrchestratorRequest],
+        max_concurrency: int = 4
+    ) -> List[OrchestratorResponse]:
+        """
+        Process independent requests concurrently (bounded), preserving input order.
+        Requests must use distinct session_ids - session state is per session.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _process_one(request: OrchestratorRequest) -> OrchestratorResponse:
+            async with semaphore:
+                return await self.process_request(request)
+        
+        return await asyncio.gather(*(_process_one(r) for r in requests))
+
     def _extract_order_info(self, evidence: List[str]) -> Dict[str, Any]:
         """
         Extract order information from evidence list.
@@ -942,6 +961,19 @@ class OrchestratorAgent:
         return get_trace_id()
 
 
+@lru_cache(maxsize=1)
+def get_orchestrator() -> OrchestratorAgent:
+    """
+    Shared OrchestratorAgent wired to the shared data service (built once).
+    Safe to reuse across callers - its only mutable state is keyed by session_id.
+    """
+    from services.data_services import get_data_service
+    
+    orchestrator = OrchestratorAgent()
+    orchestrator.set_data_service(get_data_service())
+    return orchestrator
+
+
 # Convenience function
 async def process_user_message(
     message: str,
@@ -950,9 +982,11 @@ async def process_user_message(
     data_service = None
 ) -> OrchestratorResponse:
     """Process a user message through the full agent chain."""
-    orchestrator = OrchestratorAgent()
     if data_service:
+        orchestrator = OrchestratorAgent()
         orchestrator.set_data_service(data_service)
+    else:
+        orchestrator = get_orchestrator()
     
     request = OrchestratorRequest(
         session_id=session_id,
@@ -7,16 +7,15 @@ Uses: gpt-5.2
 REFACTORED: Removed AgentExecutor/ChatPromptTemplate to ensure clean agent-only traces.
 """
 
-import os
 import json
 import uuid
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
-from openai import AsyncOpenAI
 
 from models.schemas import Decision, AgentOutput
 from utils.tracing import agent_trace, get_trace_id, create_non_traced_llm
+from services.http_clients import get_openai_client
 
 
 # ============ MODEL CONFIG ============
@@ -218,18 +217,22 @@ class PharmacistAgent:
         self.agent_name = "PharmacistAgent"
         self.model_name = model_name
         self.temperature = temperature
-        # Direct OpenAI client (not LangChain) - no auto-tracing
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.sessions: Dict[str, List[Dict[str, str]]] = {}
 
+    @property
+    def client(self):
+        """Shared OpenAI client, looked up per call so a closed pool is never reused"""
+        return get_openai_client()
+
     def _load_conversation_from_firestore(self, session_id: str, conversation_id: str):
         """
         Load conversation history from Firestore and populate the session cache.
         This enables the agent to remember previous messages including medicine names and quantities.
         """
         try:
-            from services.firestore_service import get_conversation_history
-            messages = get_conversation_history(conversation_id, limit=20)
+            from services.firestore_service import iter_conversation_history
+            # Consumed straight from the document stream into the session cache
+            messages = list(iter_conversation_history(conversation_id, limit=20))
             if messages:
                 self.sessions[session_id] = messages
                 print(f"✅ Loaded {len(messages)} messages from Firestore into session {session_id}")
@@ -5,13 +5,14 @@ EMITS STANDARDIZED OUTPUT: {agent, decision, reason, evidence, message, next_age
 Uses: gpt-5.2 (precision-critical for safety)
 """
 
-import os
+from collections import OrderedDict
 from typing import Optional, Dict, Any, List
 
 from langchain_openai import ChatOpenAI
 
 from models.schemas import Decision, AgentOutput
 from utils.tracing import agent_trace, get_trace_id, create_non_traced_llm
+from services.http_clients import get_openai_client
 
 
 # ============ MODEL CONFIG ============
@@ -31,6 +32,11 @@ QUANTITY_LIMITS = {
     "default": 90
 }
 
+# Policy decisions are rule-based; only the reasoning text comes from the LLM.
+# The same (decision, context) always gets the same justification, so it's cached.
+REASONING_CACHE_MAX_SIZE = 512
+_reasoning_cache: "OrderedDict[tuple, str]" = OrderedDict()
+
 DRUG_INTERACTIONS = {
     ("warfarin", "aspirin"): {"severity": "severe", "warning": "Increased bleeding risk"},
     ("metformin", "alcohol"): {"severity": "moderate", "warning": "Risk of lactic acidosis"},
@@ -51,13 +57,18 @@ class PolicyAgent:
         self.agent_name = "PolicyAgent"
         self.model_name = model_name
         self.temperature = temperature
-        # Direct OpenAI client for reasoning generation
-        from openai import AsyncOpenAI
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        # Use non-traced LLM to prevent LLM calls from appearing in traces
-        self.llm = create_non_traced_llm(model_name, temperature)
         self._data_service = None
 
+    @property
+    def client(self):
+        """Shared OpenAI client, looked up per call so a closed pool is never reused"""
+        return get_openai_client()
+
+    @property
+    def llm(self):
+        """Legacy non-traced LangChain LLM (memoized per model/temperature)"""
+        return create_non_traced_llm(self.model_name, self.temperature)
+
     def set_data_service(self, data_service):
         """Inject data service"""
         self._data_service = data_service
@@ -66,7 +77,14 @@ class PolicyAgent:
         """
         Generate a concise, logical reasoning string using the LLM.
         This provides 'Chain of Thought' visibility in traces.
+        Repeat (decision, context) pairs are served from a small LRU cache.
         """
+        cache_key = (self.model_name, decision, context)
+        cached = _reasoning_cache.get(cache_key)
+        if cached is not None:
+            _reasoning_cache.move_to_end(cache_key)
+            return cached
+        
         try:
             response = await self.client.chat.completions.create(
                 model=self.model_name,
@@ -84,7 +102,11 @@ class PolicyAgent:
                 # max_tokens=200 # Removed to avoid "unsupported_parameter" error with reasoning models
                 # max_completion_tokens=50
             )
-            return response.choices[0].message.content.strip()
+            reasoning = response.choices[0].message.content.strip()
+            _reasoning_cache[cache_key] = reasoning
+            while len(_reasoning_cache) > REASONING_CACHE_MAX_SIZE:
+                _reasoning_cache.popitem(last=False)
+            return reasoning
         except Exception as e:
             print(f"PolicyAgent Reasoning Error: {e}")
             return f"{decision} based on policy rules (Fallback: {str(e)})"
@@ -5,15 +5,14 @@ EMITS STANDARDIZED OUTPUT: {agent, decision, reason, evidence, message, next_age
 Uses: gpt-5-mini
 """
 
-import os
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 
-from openai import AsyncOpenAI
 from langchain_openai import ChatOpenAI
 
 from models.schemas import Decision, AgentOutput
 from utils.tracing import agent_trace, get_trace_id, create_non_traced_llm
+from services.http_clients import get_openai_client
 
 
 # ============ MODEL CONFIG ============
@@ -44,12 +43,18 @@ class RefillPredictionAgent:
         self.agent_name = "RefillPredictionAgent"
         self.model_name = model_name
         self.temperature = temperature
-        # Direct OpenAI client for LLM calls
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        # Legacy LangChain LLM (for compatibility)
-        self.llm = create_non_traced_llm(model_name, temperature)
         self._data_service = None
 
+    @property
+    def client(self):
+        """Shared OpenAI client, looked up per call so a closed pool is never reused"""
+        return get_openai_client()
+
+    @property
+    def llm(self):
+        """Legacy non-traced LangChain LLM (memoized per model/temperature)"""
+        return create_non_traced_llm(self.model_name, self.temperature)
+
     def set_data_service(self, data_service):
         """Inject data service"""
         self._data_service = data_service
@@ -215,7 +220,7 @@ class RefillPredictionAgent:
         # Get patient history
         history = self._data_service.get_patient_order_history(patient_id)
         
-        if history.empty:
+        if not history:
             return AgentOutput(
                 agent=self.agent_name,
                 decision=Decision.REJECTED,
@@ -225,11 +230,17 @@ class RefillPredictionAgent:
                 next_agent=None
             )
         
-        # Find last order for this medicine
+        # Find orders for this medicine, each with its date parsed once
+        # (naive datetimes, like the history helpers in DataService)
+        from services.data_services import _parse_order_date
         med_lower = medicine_name.lower()
-        med_history = history[history['medicine_name'].str.lower().str.contains(med_lower)]
+        med_history = [
+            (order_date, order) for order in history
+            if med_lower in str(order.get('medicine_name') or order.get('medicine', '')).lower()
+            and (order_date := _parse_order_date(order)) is not None
+        ]
         
-        if med_history.empty:
+        if not med_history:
             context = f"No prior history for {medicine_name}. Treated as new prescription/first fill."
             reason = await self._generate_reasoning(context, "APPROVED")
             
@@ -246,9 +257,8 @@ class RefillPredictionAgent:
                 next_agent="InventoryAgent"
             )
         
-        # Calculate days since last order
-        last_order = med_history.iloc[-1]
-        last_date = datetime.fromisoformat(str(last_order['order_date']))
+        # Calculate days since last order (history order isn't guaranteed - take the latest date)
+        last_date, last_order = max(med_history, key=lambda entry: entry[0])
         quantity = int(last_order.get('quantity', 30))
         days_supply = quantity  # Assume 1 per day
         days_since = (datetime.now() - last_date).days
@@ -309,7 +319,7 @@ class RefillPredictionAgent:
         
         history = self._data_service.get_patient_order_history(patient_id)
         
-        if history.empty:
+        if not history:
             return AgentOutput(
                 agent=self.agent_name,
                 decision=Decision.REJECTED,
@@ -377,22 +387,35 @@ class RefillPredictionAgent:
             return f"I've checked your refills. {task}"
 
     @agent_trace("RefillPredictionAgent", "gpt-5-mini")
-    async def evaluate_patient_refills(self, user_id: str) -> List[Dict[str, Any]]:
+    async def evaluate_patient_refills(
+        self,
+        user_id: str,
+        now: Optional[datetime] = None,
+        orders: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Core logic: Evaluate all active medicines for a user and persist alerts.
         Runs on: Order Confirm, Login, Daily Job.
+        
+        Args:
+            now: Reference time for days-remaining math (defaults to datetime.now();
+                 tests pin it so refill windows are deterministic without waiting)
+            orders: Pre-fetched order history (batch jobs load many users at once);
+                    fetched with get_orders when None
         """
         if not self._data_service or not user_id:
             return []
 
         try:
-            # 1. Fetch Order History
+            # 1. Fetch Order History (unless the caller already batched it)
             from services.firestore_service import get_orders, get_db
-            orders = get_orders(user_id, limit=50) # Look back far enough
+            if orders is None:
+                orders = get_orders(user_id, limit=50) # Look back far enough
             if not orders:
                 return []
             
             # 2. Group by Medicine (Get latest order per medicine)
+            # Each orderedAt is parsed once and kept alongside its order
             latest_orders = {}
             for order in orders:
                 med_name = order.get("medicine", "").strip()
@@ -408,24 +431,19 @@ class RefillPredictionAgent:
                     continue
                     
                 # Keep latest
-                if med_name not in latest_orders:
-                    latest_orders[med_name] = order
-                else:
-                    curr_date = datetime.fromisoformat(latest_orders[med_name]["orderedAt"])
-                    if ordered_at > curr_date:
-                        latest_orders[med_name] = order
+                if med_name not in latest_orders or ordered_at > latest_orders[med_name][0]:
+                    latest_orders[med_name] = (ordered_at, order)
 
-            current_time = datetime.now()
+            current_time = now or datetime.now()
             alerts = []
             
             # 3. Calculate Eligibility & Generate Alerts
-            for med_name, order in latest_orders.items():
+            for med_name, (ordered_at, order) in latest_orders.items():
                 quantity = int(order.get("quantity", 30))
                 # Simple consumption model: 1 per day (can be enhanced with dosage parsing)
                 daily_consumption = 1 
                 
                 # Calculate dates
-                ordered_at = datetime.fromisoformat(order["orderedAt"])
                 if ordered_at.tzinfo: ordered_at = ordered_at.replace(tzinfo=None)
                 
                 days_supply = quantity / daily_consumption
@@ -7,16 +7,12 @@ This agent ONLY suggests - final confirmation is required from user.
 IMPORTANT: This is AI-assisted identification and does NOT replace pharmacist judgment.
 """
 
-import os
 import json
 from typing import Dict, Any, List, Optional
-from openai import AsyncOpenAI
 
 from models.schemas import AgentOutput, Decision
 from utils.tracing import agent_trace
-
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from services.http_clients import get_openai_client
 
 # Model configuration
 MODEL_NAME = "gpt-5.2"  # Vision-capable model
@@ -101,7 +97,7 @@ class VisionPillIdentifierAgent:
             image_type = "image/jpeg"
             
             # Call GPT Vision
-            response = await client.chat.completions.create(
+            response = await get_openai_client().chat.completions.create(
                 model=MODEL_NAME,
                 messages=[
                     {
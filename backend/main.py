@@ -4,11 +4,13 @@ Main entry point for the pharmacy AI system.
 """
 
 import os
+import logging
 from contextlib import asynccontextmanager
 from typing import Optional
 from datetime import datetime
 
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -16,10 +18,15 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Service modules log through `logging`; show INFO alongside uvicorn's output
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(levelname)s:     %(name)s - %(message)s")
+
 # Import agents and services
 from agents import OrchestratorAgent
-from services.data_services import data_service
-from services.firestore_service import get_orders, get_db  # Import Firestore service
+from services.data_services import get_data_service
+from services.firestore_service import get_orders_page, get_order, get_db  # Import Firestore service
+from services.http_clients import close_openai_http_client
+from services.whatsapp_service import drain_whatsapp_queue
 from models.schemas import OrchestratorRequest, OrchestratorResponse
 from utils.tracing import init_langsmith
 from utils.auth import get_current_user, get_optional_user, init_firebase
@@ -77,6 +84,10 @@ async def lifespan(app: FastAPI):
     else:
         print("⚠️ Firebase Auth not configured - API will be unprotected")
     
+    # Connect the shared data service (created lazily on first use)
+    data_service = get_data_service()
+    orchestrator.set_data_service(data_service)
+    refill_agent.set_data_service(data_service)
     print("✅ Data service loaded")
     
     # Start Background Scheduler
@@ -87,6 +98,8 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     print("👋 Shutting down...")
+    await drain_whatsapp_queue()
+    await close_openai_http_client()
 
 
 app = FastAPI(
@@ -106,13 +119,12 @@ app.add_middleware(
 )
 
 # Initialize orchestrator
+# (data service is injected at startup - see lifespan)
 orchestrator = OrchestratorAgent()
-orchestrator.set_data_service(data_service)
 
 # Initialize Refill Agent for background jobs
 from agents import RefillPredictionAgent
 refill_agent = RefillPredictionAgent()
-refill_agent.set_data_service(data_service)
 
 async def run_daily_refill_check():
     """
@@ -125,11 +137,20 @@ async def run_daily_refill_check():
         try:
             print("🕒 Starting Daily Refill Check...")
             # 1. Get all users
+            data_service = get_data_service()
             users = data_service.get_all_patients()
             
+            # 2. Load every user's history with batched 'in' queries (30 ids each)
+            # instead of one history query per user
+            histories = await asyncio.to_thread(
+                data_service.get_order_histories, [user.patient_id for user in users]
+            )
+            
             for user in users:
                 # Calculate & Persist
-                alerts = await refill_agent.evaluate_patient_refills(user.patient_id)
+                alerts = await refill_agent.evaluate_patient_refills(
+                    user.patient_id, orders=histories.get(user.patient_id, [])
+                )
                 
                 # Send Notifications
                 if alerts:
@@ -476,9 +497,9 @@ async def identify_pill(
 async def search_inventory(query: str = ""):
     """Search inventory for medicines - returns complete medicine data"""
     if query:
-        medicines = data_service.search_medicine(query)
+        medicines = await get_data_service().search_medicine_async(query)
     else:
-        medicines = data_service.get_all_medicines()
+        medicines = await get_data_service().get_all_medicines_async()
     
     return {
         "query": query,
@@ -505,13 +526,13 @@ async def search_inventory(query: str = ""):
 @app.get("/inventory/stats")
 async def inventory_stats():
     """Get inventory statistics"""
-    return data_service.get_inventory_stats()
+    return await get_data_service().get_inventory_stats_async()
 
 
 @app.get("/patients")
 async def get_patients():
     """Get all patients - returns array format for frontend"""
-    patients = data_service.get_all_patients()
+    patients = get_data_service().get_all_patients()
     # Return as array (frontend expects this format)
     return [
         {
@@ -646,13 +667,46 @@ async def process_voice(
         raise HTTPException(status_code=500, detail=f"Voice processing failed: {str(e)}")
 
 
+@app.post("/voice/tts")
+async def text_to_speech_audio(request: dict):
+    """
+    Text → speech as raw audio bytes.
+    
+    Input: { text: string, voice?: string, format?: string }
+    Output: audio/<format> body streamed as it is synthesized (no base64/JSON wrapping)
+    """
+    from services.voice_service import voice_service, VoiceServiceError
+    
+    text = request.get("text", "")
+    if not text:
+        raise HTTPException(status_code=400, detail="text is required")
+    
+    output_format = request.get("format", "mp3")
+    audio_stream = voice_service.stream_text_to_speech(text, voice=request.get("voice", "nova"), output_format=output_format)
+    
+    # Pull the first chunk up front so TTS failures still map to an HTTP error
+    try:
+        first_chunk = await audio_stream.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+    except VoiceServiceError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    
+    async def _audio_body():
+        yield first_chunk
+        async for chunk in audio_stream:
+            yield chunk
+    
+    return StreamingResponse(_audio_body(), media_type=f"audio/{output_format}")
+
+
 @app.get("/patients/{patient_id}/refills")
 async def get_patient_refills(patient_id: str, days_ahead: int = 30):
     """Get refill predictions for a patient"""
-    refills = data_service.get_medicines_needing_refill(patient_id, datetime.now())
+    refills = get_data_service().get_medicines_needing_refill(patient_id, datetime.now())
     
     # Get patient info
-    patients = data_service.get_all_patients()
+    patients = get_data_service().get_all_patients()
     patient = next((p for p in patients if p.patient_id == patient_id), None)
     patient_name = patient.patient_name if patient else f"Patient {patient_id}"
     
@@ -726,16 +780,15 @@ async def get_patient_refills(patient_id: str, days_ahead: int = 30):
 @app.get("/patients/{patient_id}/history")
 async def get_patient_history(patient_id: str):
     """Get order history for a patient"""
-    history = data_service.get_patient_order_history(patient_id)
+    history = get_data_service().get_patient_order_history(patient_id)
     
-    if history.empty:
+    if not history:
         return {"patient_id": patient_id, "orders": []}
     
-    orders = history.to_dict("records")
     return {
         "patient_id": patient_id,
-        "order_count": len(orders),
-        "orders": orders
+        "order_count": len(history),
+        "orders": history
     }
 
 
@@ -744,14 +797,14 @@ async def get_patient_history(patient_id: str):
 @app.get("/inventory/stats")
 async def get_inventory_stats():
     """Get inventory statistics for admin dashboard"""
-    stats = data_service.get_inventory_stats()
+    stats = await get_data_service().get_inventory_stats_async()
     return stats
 
 
 @app.get("/inventory/medicines")
 async def get_all_medicines(query: str = ""):
     """Get all medicines in inventory, optionally filtered by search query"""
-    medicines = data_service.get_all_medicines()
+    medicines = await get_data_service().get_all_medicines_async()
     
     # Filter by query if provided
     if query:
@@ -768,10 +821,14 @@ async def get_all_medicines(query: str = ""):
 # ============ ORDER ENDPOINTS (Customer "My Orders") ============
 
 @app.get("/orders")
-async def get_user_orders(current_user: Optional[dict] = Depends(get_optional_user)):
+async def get_user_orders(
+    cursor: Optional[str] = None,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
     """
-    Get all orders for the authenticated user.
+    Get orders for the authenticated user, newest first.
     Strictly enforced by userId in token.
+    Pass the returned next_cursor back as ?cursor= to fetch the next page.
     """
     if not current_user:
         raise HTTPException(status_code=401, detail="Authentication required")
@@ -780,9 +837,12 @@ async def get_user_orders(current_user: Optional[dict] = Depends(get_optional_us
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid user token")
         
-    # security: get_orders strictly filters by user_id
-    orders = get_orders(user_id, limit=20) 
-    return {"orders": orders}
+    # security: get_orders_page strictly filters by user_id
+    try:
+        page = get_orders_page(user_id, limit=20, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"orders": page["orders"], "next_cursor": page["next_cursor"]}
 
 
 @app.get("/orders/{order_id}")
@@ -796,30 +856,15 @@ async def get_order_details(order_id: str, current_user: Optional[dict] = Depend
         
     user_id = current_user.get("uid")
     
-    # We don't have a get_order_by_id in firestore_service yet that checks ownership
-    # effectively, but we can implement a quick check using the existing get_db
-    
-    db = get_db()
-    if not db:
+    if not get_db():
         raise HTTPException(status_code=503, detail="Database unavailable")
-        
-    doc_ref = db.collection("orders").document(order_id)
-    doc = doc_ref.get()
-    
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Order not found")
-        
-    order_data = doc.to_dict()
     
-    # STRICT SECURITY CHECK
-    if order_data.get("userId") != user_id:
-        # Do not throw 403, throw 404 to avoid leaking existence
+    # STRICT SECURITY CHECK: get_order only returns orders owned by user_id
+    order_data = get_order(user_id, order_id)
+    if order_data is None:
+        # Missing and not-yours look the same - don't leak existence with a 403
         raise HTTPException(status_code=404, detail="Order not found")
         
-    # Format timestamps
-    if "orderedAt" in order_data and hasattr(order_data["orderedAt"], "isoformat"):
-        order_data["orderedAt"] = order_data["orderedAt"].isoformat()
-        
     return order_data
 
 
@@ -190,6 +190,19 @@ class PrescriptionUploadData(BaseModel):
     message: str = "This medication requires a valid prescription"
 
 
+class PrescriptionValidationResult(BaseModel):
+    """Vision model verdict for an uploaded prescription image"""
+    is_valid: bool
+    doctor_name: Optional[str] = None
+    date: Optional[str] = None
+    patient_name: Optional[str] = None
+    medicines: List[str] = []
+    hospital_name: Optional[str] = None
+    has_signature: bool = False
+    confidence: float = 0.0
+    rejection_reason: Optional[str] = None
+
+
 # ============ Structured Agent Responses ============
 
 class AgentDecision(BaseModel):
@@ -0,0 +1,73 @@
+"""
+Backfill Script: Mirror /orders into orders_by_user/{user_id}/orders
+====================================================================
+REQUIRED once after deploying the per-user order index: get_orders only
+falls back to /orders when a user's mirror is empty, so without this a
+user's pre-mirror orders disappear as soon as they place a new one.
+
+    cd backend && python scripts/backfill_orders_by_user.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+# Initialize Firebase
+import firebase_admin
+from firebase_admin import credentials
+
+if not firebase_admin._apps:
+    cred_path = os.path.join(backend_dir, "service-account.json")
+    if os.path.exists(cred_path):
+        cred = credentials.Certificate(cred_path)
+        firebase_admin.initialize_app(cred)
+        print("✓ Firebase initialized")
+    else:
+        print(f"❌ Firebase credentials not found at {cred_path}")
+        sys.exit(1)
+
+from firebase_admin import firestore
+from services.firestore_service import BATCH_MAX_WRITES, ORDERS_BY_USER_COLLECTION
+
+
+def backfill_orders_by_user():
+    """Copy every /orders doc that has a userId into its owner's subcollection"""
+    db = firestore.client()
+    
+    batch = db.batch()
+    pending = 0
+    copied = 0
+    skipped = 0
+    
+    for doc in db.collection("orders").stream():
+        data = doc.to_dict()
+        user_id = data.get("userId")
+        if not user_id:
+            skipped += 1
+            continue
+        
+        mirror_ref = (db.collection(ORDERS_BY_USER_COLLECTION)
+                      .document(user_id)
+                      .collection("orders")
+                      .document(doc.id))
+        batch.set(mirror_ref, data)
+        pending += 1
+        copied += 1
+        
+        if pending >= BATCH_MAX_WRITES:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    
+    if pending:
+        batch.commit()
+    
+    print(f"✅ Mirrored {copied} orders ({skipped} without userId skipped)")
+
+
+if __name__ == "__main__":
+    backfill_orders_by_user()
@@ -84,9 +84,11 @@ def create_test_refill_order(user_email: str):
         "totalAmount": 165.00,
     }
     
-    # Save to Firestore
-    doc_ref = db.collection("orders").document(order_id)
-    doc_ref.set(test_order)
+    # Save to Firestore (canonical doc + per-user mirror read by get_orders)
+    batch = db.batch()
+    batch.set(db.collection("orders").document(order_id), test_order)
+    batch.set(db.collection("orders_by_user").document(user_id).collection("orders").document(order_id), test_order)
+    batch.commit()
     
     print(f"""
 ✅ Test order created successfully!
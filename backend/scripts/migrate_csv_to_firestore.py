@@ -8,6 +8,30 @@ from datetime import datetime
 # Add backend to path to import utils
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from utils.auth import init_firebase
+from services.firestore_service import ORDERS_BY_USER_COLLECTION
+
+# Explicit column projections/dtypes so pandas skips type inference and
+# unused columns (e.g. last_updated, patient contact details)
+MEDICINE_DTYPES = {
+    'medicine_id': 'string',
+    'name': 'string',
+    'strength': 'string',
+    'form': 'category',
+    'category': 'category',
+    'stock_level': 'int32',
+    'price': 'float64',
+    'prescription_required': 'string',
+}
+
+ORDER_DTYPES = {
+    'order_id': 'string',
+    'patient_id': 'string',
+    'patient_name': 'string',
+    'medicine_name': 'string',
+    'quantity': 'int32',
+    'order_date': 'string',
+    'status': 'category',
+}
 
 def migrate_medicines(db, csv_path):
     print(f"\n💊 Migrating Medicines from {csv_path}...")
@@ -15,11 +39,11 @@ def migrate_medicines(db, csv_path):
         print("❌ File not found.")
         return
 
-    df = pd.read_csv(csv_path)
+    df = pd.read_csv(csv_path, usecols=list(MEDICINE_DTYPES), dtype=MEDICINE_DTYPES)
     collection = db.collection('medicines')
     
     count = 0
-    for _, row in df.iterrows():
+    for row in df.to_dict("records"):
         try:
             # Map CSV columns to Firestore schema
             # Using 'name' from CSV as 'medicine_name' in Firestore to match schema
@@ -31,6 +55,8 @@ def migrate_medicines(db, csv_path):
             data = {
                 'medicine_id': medicine_id,
                 'medicine_name': str(row['name']),
+                # Normalized name for case-insensitive lookups (DataService.decrease_stock)
+                'medicine_name_lower': str(row['name']).lower().strip(),
                 'strength': str(row.get('strength', '')),
                 'form': str(row.get('form', 'Tablet')),
                 'category': str(row.get('category', 'General')),
@@ -59,11 +85,11 @@ def migrate_orders(db, csv_path):
         print("❌ File not found.")
         return
 
-    df = pd.read_csv(csv_path)
+    df = pd.read_csv(csv_path, usecols=list(ORDER_DTYPES), dtype=ORDER_DTYPES)
     collection = db.collection('orders')
     
     count = 0
-    for _, row in df.iterrows():
+    for row in df.to_dict("records"):
         try:
             order_id = str(row['order_id'])
             patient_id = str(row['patient_id'])
@@ -87,7 +113,12 @@ def migrate_orders(db, csv_path):
                 'legacy_import': True
             }
             
-            collection.document(order_id).set(data)
+            # Canonical doc + per-user mirror (read by get_orders), in one commit
+            batch = db.batch()
+            batch.set(collection.document(order_id), data)
+            batch.set(db.collection(ORDERS_BY_USER_COLLECTION).document(patient_id)
+                      .collection('orders').document(order_id), data)
+            batch.commit()
             print(f"   ✓ Imported Order {order_id}")
             count += 1
         except Exception as e:
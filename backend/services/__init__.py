@@ -1,10 +1,10 @@
 # Services package
-from .data_services import DataService, data_service
+from .data_services import DataService, get_data_service
 from .voice_service import VoiceService, voice_service
 
 __all__ = [
     "DataService",
-    "data_service",
+    "get_data_service",
     "VoiceService", 
     "voice_service",
 ]
@@ -5,16 +5,76 @@ Replaces legacy CSV implementation.
 """
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import firebase_admin
-from firebase_admin import firestore
+from firebase_admin import firestore, firestore_async
+from google.api_core.exceptions import FailedPrecondition
 from google.cloud.firestore_v1.base_query import FieldFilter
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Tuple
 
 from models.schemas import Medicine, Patient
 from utils.auth import init_firebase
 
 
+# Firestore caps the number of values in an 'in' filter at 30
+FIRESTORE_IN_LIMIT = 30
+
+# Number of partitions (and reader threads) for full scans of the medicines collection
+MEDICINE_READ_PARTITIONS = 8
+# Only partition once the catalog is this large - below it the extra
+# PartitionQuery round trip costs more than a single stream
+MEDICINE_PARTITION_THRESHOLD = 5000
+
+# Order statuses that prove a prescription was verified
+VALID_PRESCRIPTION_STATUSES = ["CONFIRMED", "SHIPPED", "DELIVERED", "COMPLETED"]
+
+# How far in the past stale (read_time) reads look; lets Firestore serve them
+# from any replica without checking with the leader for the latest version
+STALE_READ_SECONDS = 30
+
+# Optimistic stock updates retried this many times if the document changes under us
+STOCK_UPDATE_ATTEMPTS = 5
+
+# How long materialized Medicine objects are reused before re-reading Firestore
+# (stock changes made through this service invalidate the cache immediately)
+MEDICINE_CACHE_TTL_SECONDS = 60
+
+# Defaults for fields missing from a Firestore medicine document
+MEDICINE_DEFAULTS: Dict[str, Any] = {
+    'medicine_id': '',
+    'medicine_name': '',
+    'strength': '',
+    'form': 'Tablet',
+    'stock_level': 0,
+    'prescription_required': False,
+    'category': 'General',
+    'discontinued': False,
+    'max_quantity_per_order': 30,
+    'controlled_substance': False,
+}
+
+# Order fields needed to build a Patient record
+PATIENT_FIELDS = ['patient_id', 'patient_name', 'patient_email', 'patient_phone']
+
+
+def _parse_order_date(order: Dict[str, Any]) -> Optional[datetime]:
+    """Parse an order's date (ISO string or datetime) into a naive datetime"""
+    value = order.get('orderedAt', order.get('order_date'))
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    elif not isinstance(value, datetime):
+        return None
+    
+    # Naive comparison for simplicity
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
 class DataService:
     """
     Data service for accessing pharmacy data from Firestore.
@@ -31,40 +91,147 @@ class DataService:
         except Exception as e:
             print(f"❌ DataService failed to connect to Firestore: {e}")
             self.db = None
+        
+        # Async client for event-loop friendly reads from FastAPI routes
+        try:
+            self.async_db = firestore_async.client()
+        except Exception as e:
+            print(f"❌ DataService failed to create async Firestore client: {e}")
+            self.async_db = None
+        
+        # Shared pool for fanning out partitioned collection reads
+        self._read_pool = ThreadPoolExecutor(max_workers=MEDICINE_READ_PARTITIONS)
+        
+        # Materialized Medicine objects, rebuilt only after a write or TTL expiry
+        self._all_medicines_cache: Optional[List[Medicine]] = None
+        self._id_to_medicine: Dict[str, Medicine] = {}
+        self._medicines_cached_at = 0.0
+        # Size of the last catalog load (decides whether the next one is partitioned)
+        self._medicine_count = 0
+        # Search results per lower-cased query, valid for the current medicine cache
+        self._search_results: Dict[str, List[Medicine]] = {}
+    
+    def _stream_medicines(self) -> List[Dict[str, Any]]:
+        """
+        Read every medicine document.
+        Small catalogs (the usual case) are a single stream. Once the last load
+        exceeded MEDICINE_PARTITION_THRESHOLD, the collection is split into
+        partition queries that are streamed concurrently.
+        """
+        if self._medicine_count <= MEDICINE_PARTITION_THRESHOLD:
+            return [doc.to_dict() for doc in self.db.collection('medicines').stream()]
+        
+        partitions = list(
+            self.db.collection_group('medicines').get_partitions(MEDICINE_READ_PARTITIONS)
+        )
+        if len(partitions) <= 1:
+            return [doc.to_dict() for doc in self.db.collection('medicines').stream()]
+        
+        def read_partition(partition):
+            # Partitions span the whole 'medicines' collection group - keep only
+            # top-level /medicines docs, not nested medicines subcollections
+            return [
+                doc.to_dict() for doc in partition.query().stream()
+                if doc.reference.parent.parent is None
+            ]
+        
+        return [
+            data
+            for chunk in self._read_pool.map(read_partition, partitions)
+            for data in chunk
+        ]
+    
+    async def _stream_medicines_async(self) -> List[Dict[str, Any]]:
+        """Read every medicine document without blocking the event loop"""
+        return [doc.to_dict() async for doc in self.async_db.collection('medicines').stream()]
+    
+    def _cache_medicines(self, docs: List[Dict[str, Any]]) -> List[Medicine]:
+        """Build Medicine objects once and keep them for later reads"""
+        medicines = [self._map_firestore_to_medicine(data) for data in docs]
+        self._all_medicines_cache = medicines
+        self._id_to_medicine = {m.medicine_id: m for m in medicines}
+        self._medicines_cached_at = time.monotonic()
+        self._medicine_count = len(medicines)
+        self._search_results = {}
+        return medicines
+    
+    def _cached_medicines(self) -> Optional[List[Medicine]]:
+        """Return the cached medicines if still fresh, else None"""
+        if self._all_medicines_cache is None:
+            return None
+        if time.monotonic() - self._medicines_cached_at > MEDICINE_CACHE_TTL_SECONDS:
+            return None
+        return self._all_medicines_cache
+    
+    def _load_medicines(self) -> List[Medicine]:
+        """Get all medicines, reading Firestore only on a cache miss"""
+        medicines = self._cached_medicines()
+        if medicines is None:
+            medicines = self._cache_medicines(self._stream_medicines())
+        return medicines
+    
+    async def _load_medicines_async(self) -> List[Medicine]:
+        """Get all medicines, reading Firestore (async client) only on a cache miss"""
+        medicines = self._cached_medicines()
+        if medicines is None:
+            medicines = self._cache_medicines(await self._stream_medicines_async())
+        return medicines
+    
+    def invalidate_medicine_cache(self) -> None:
+        """Drop cached Medicine objects (call after any stock/catalog write)"""
+        self._all_medicines_cache = None
+        self._id_to_medicine = {}
+        self._search_results = {}
+    
+    def _match_medicines(self, medicines: List[Medicine], query: str) -> List[Medicine]:
+        """Filter medicines whose name or ID contains the query (memoized per cache load)"""
+        query_lower = query.lower()
+        cacheable = medicines is self._all_medicines_cache
+        if cacheable and query_lower in self._search_results:
+            return list(self._search_results[query_lower])
+        
+        matches = [
+            m for m in medicines
+            if query_lower in m.medicine_name.lower() or query_lower in m.medicine_id.lower()
+        ]
+        if cacheable:
+            self._search_results[query_lower] = matches
+        return list(matches)
     
     def search_medicine(self, query: str) -> List[Medicine]:
         """Search medicines by name in Firestore"""
         if not self.db:
             return []
         
-        medicines = []
         try:
             # Firestore doesn't have native full-text search, so we do client-side filtering 
             # for this MVP or simple prefix matching if possible.
             # For scale, would use Algolia/Elasticsearch.
             # Fetching all for now since dataset is small < 100 items.
-            docs = self.db.collection('medicines').stream()
-            
-            query_lower = query.lower()
-            
-            for doc in docs:
-                data = doc.to_dict()
-                name = data.get('medicine_name', '').lower()
-                med_id = data.get('medicine_id', '').lower()
-                
-                if query_lower in name or query_lower in med_id:
-                    medicines.append(self._map_firestore_to_medicine(data))
-                    
+            return self._match_medicines(self._load_medicines(), query)
         except Exception as e:
             print(f"Error searching medicines: {e}")
-            
-        return medicines
+            return []
+    
+    async def search_medicine_async(self, query: str) -> List[Medicine]:
+        """Search medicines by name in Firestore (async client)"""
+        if not self.async_db:
+            return []
+        
+        try:
+            return self._match_medicines(await self._load_medicines_async(), query)
+        except Exception as e:
+            print(f"Error searching medicines: {e}")
+            return []
     
     def get_medicine_by_id(self, medicine_id: str) -> Optional[Medicine]:
         """Get medicine by ID"""
         if not self.db:
             return None
         
+        if self._cached_medicines() is not None and medicine_id in self._id_to_medicine:
+            return self._id_to_medicine[medicine_id]
+        
         try:
             doc_ref = self.db.collection('medicines').document(medicine_id)
             doc = doc_ref.get()
@@ -79,21 +246,19 @@ class DataService:
 
     def _map_firestore_to_medicine(self, data: Dict[str, Any]) -> Medicine:
         """Helper to map Firestore dict to Pydantic model"""
-        return Medicine(
-            medicine_id=str(data.get('medicine_id', '')),
-            medicine_name=str(data.get('medicine_name', '')),
-            strength=str(data.get('strength', '')),
-            form=str(data.get('form', 'Tablet')),
-            stock_level=int(data.get('stock_level', 0)),
-            prescription_required=bool(data.get('prescription_required', False)),
-            category=str(data.get('category', 'General')),
-            discontinued=bool(data.get('discontinued', False)),
-            max_quantity_per_order=int(data.get('max_quantity_per_order', 30)),
-            controlled_substance=bool(data.get('controlled_substance', False))
-        )
+        # Missing or null fields take the default; present ones are coerced to the
+        # default's type (str/int/bool), e.g. a numeric medicine_id or strength
+        return Medicine(**{
+            field: default if (value := data.get(field)) is None else type(default)(value)
+            for field, default in MEDICINE_DEFAULTS.items()
+        })
     
-    def get_patient_order_history(self, patient_id: str) -> List[Dict[str, Any]]:
-        """Get order history for a patient from Firestore"""
+    def get_patient_order_history(self, patient_id: str, stale: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get order history for a patient from Firestore.
+        stale=True reads the data as of STALE_READ_SECONDS ago (faster, but misses
+        orders written in that window) - only for callers without freshness needs.
+        """
         if not self.db:
             return []
         
@@ -104,7 +269,18 @@ class DataService:
             orders_ref = self.db.collection('orders')
             query = orders_ref.where(filter=FieldFilter("patient_id", "==", patient_id))
             
-            docs = query.stream()
+            docs = None
+            if stale:
+                try:
+                    # Materialized so any read_time failure surfaces inside this try
+                    docs = list(query.stream(
+                        read_time=datetime.now(timezone.utc) - timedelta(seconds=STALE_READ_SECONDS)
+                    ))
+                except TypeError:
+                    # google-cloud-firestore without read_time support - do a normal read
+                    docs = None
+            if docs is None:
+                docs = query.stream()
             orders = []
             
             for doc in docs:
@@ -114,26 +290,39 @@ class DataService:
                     data['orderedAt'] = data['orderedAt'].isoformat()
                 orders.append(data)
             
-            # Since we promised to return DataFrame-like list of dicts for now (or just list of dicts)
-            # The original return type hint said pd.DataFrame but code returned it for some callers.
-            # Converting to standard list of dicts is safer for API.
-            # Let's check usages. It was returning pd.DataFrame in legacy.
-            # We should probably return a DataFrame if we want minimal breakage, 
-            # OR update call sites. 
-            # Updating logic to return list, converting to DF at edge if needed by existing code.
-            # Looking at main.py:502: history = data_service.get_patient_order_history(patient_id)
-            # Then main.py:504: if history.empty: ...
-            # So main.py EXPECTS a DataFrame.
-            
-            import pandas as pd
-            if not orders:
-                return pd.DataFrame()
-            return pd.DataFrame(orders)
+            return orders
             
         except Exception as e:
             print(f"Error fetching history: {e}")
-            import pandas as pd
-            return pd.DataFrame()
+            return []
+
+    def get_order_histories(self, patient_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get order history for several patients at once.
+        Uses batched 'in' queries (30 ids per query) instead of one query per patient.
+        """
+        histories: Dict[str, List[Dict[str, Any]]] = {pid: [] for pid in patient_ids}
+        if not self.db or not histories:
+            return histories
+        
+        try:
+            orders_ref = self.db.collection('orders')
+            ids = list(histories)
+            
+            for start in range(0, len(ids), FIRESTORE_IN_LIMIT):
+                chunk = ids[start:start + FIRESTORE_IN_LIMIT]
+                query = orders_ref.where(filter=FieldFilter("patient_id", "in", chunk))
+                
+                for doc in query.stream():
+                    data = doc.to_dict()
+                    if 'orderedAt' in data and hasattr(data['orderedAt'], 'isoformat'):
+                        data['orderedAt'] = data['orderedAt'].isoformat()
+                    histories.setdefault(data.get('patient_id'), []).append(data)
+                    
+        except Exception as e:
+            print(f"Error fetching batched history: {e}")
+            
+        return histories
 
     def has_valid_prescription(self, user_id: str, medicine_name: str, dosage: str) -> bool:
         """
@@ -151,17 +340,39 @@ class DataService:
             return False
             
         try:
+            target_med = medicine_name.lower().strip()
+            target_dosage = dosage.strip()
+            
+            # Fast path: let Firestore find an exact match via the composite index on
+            # (userId, medicine_lower, dosage, prescriptionRequired, status)
+            # defined in firestore.indexes.json
+            query = (self.db.collection('orders')
+                     .where(filter=FieldFilter("userId", "==", user_id))
+                     .where(filter=FieldFilter("medicine_lower", "==", target_med))
+                     .where(filter=FieldFilter("dosage", "==", target_dosage))
+                     .where(filter=FieldFilter("prescriptionRequired", "==", True))
+                     .where(filter=FieldFilter("status", "in", VALID_PRESCRIPTION_STATUSES))
+                     .limit(1))
+            try:
+                match = next(iter(query.get()), None)
+            except FailedPrecondition as e:
+                # Index not deployed (yet) - the scan below still gives the right answer
+                print(f"⚠️ Prescription index missing, scanning recent orders: {e}")
+                match = None
+            if match is not None:
+                print(f"✅ Found valid prescription from Order {match.id}")
+                return True
+            
+            # Fallback for orders saved before medicine_lower existed and for
+            # partial name matches (e.g. "Paracetamol" vs "Paracetamol 500mg")
             from services.firestore_service import get_orders
             # reuse existing strict user-scoped query
             orders = get_orders(user_id, limit=20) 
             
-            target_med = medicine_name.lower().strip()
-            target_dosage = dosage.strip()
-            
             for order in orders:
                 # 1. Check Status (Must be a completed/confirmed order)
                 status = order.get("status", "").upper()
-                if status not in ["CONFIRMED", "SHIPPED", "DELIVERED", "COMPLETED"]:
+                if status not in VALID_PRESCRIPTION_STATUSES:
                     continue
                     
                 # 2. Check Medicine Name
@@ -199,44 +410,27 @@ class DataService:
         days_ahead: int = 30
     ) -> List[Dict[str, Any]]:
         """Get medicines that need refill soon based on history"""
-        # Reuse history fetch (returns DataFrame)
-        history_df = self.get_patient_order_history(patient_id)
+        orders = self.get_patient_order_history(patient_id)
         
-        if history_df.empty:
+        if not orders:
             return []
         
+        # Keep only the latest order per medicine, parsing each date once
+        latest_orders: Dict[str, Tuple[datetime, Dict[str, Any]]] = {}
+        for order in orders:
+            medicine = order.get('medicine') or order.get('medicine_name')
+            order_date = _parse_order_date(order)
+            if not medicine or order_date is None:
+                continue
+            if medicine not in latest_orders or order_date > latest_orders[medicine][0]:
+                latest_orders[medicine] = (order_date, order)
+        
         refills = []
         
-        # Logic remains similar but operating on the DF we just built from Firestore data
-        if 'medicine' in history_df.columns:
-             med_col = 'medicine'
-        elif 'medicine_name' in history_df.columns:
-            med_col = 'medicine_name'
-        else:
-            return []
-
-        for medicine in history_df[med_col].unique():
-            med_history = history_df[history_df[med_col] == medicine]
-            last_order = med_history.iloc[-1]
-            
-            try:
-                # Firestore timestamp string or object handling
-                order_date_val = last_order.get('orderedAt', last_order.get('order_date'))
-                if isinstance(order_date_val, str):
-                    order_date = datetime.fromisoformat(order_date_val.replace('Z', '+00:00'))
-                elif isinstance(order_date_val, datetime):
-                    order_date = order_date_val
-                else:
-                    continue
-            except:
-                continue
-            
+        for medicine, (order_date, last_order) in latest_orders.items():
             quantity = int(last_order.get('quantity', 30))
             days_supply = quantity  # Assume 1 per day
             
-            if order_date.tzinfo:
-                order_date = order_date.replace(tzinfo=None) # Naive comparison for simplicity
-                
             refill_date = order_date + timedelta(days=days_supply)
             days_remaining = (refill_date - current_date).days
             
@@ -251,42 +445,54 @@ class DataService:
         
         return sorted(refills, key=lambda x: x["days_remaining"])
     
+    def _summarize_inventory(self, medicines: List[Medicine]) -> Dict[str, Any]:
+        """Count stock levels across medicines"""
+        # For large datasets, use aggregation queries. 
+        # For <1000 items, client side counting is fine.
+        total = 0
+        out_of_stock = 0
+        low_stock = 0
+        prescription_required = 0
+        
+        for medicine in medicines:
+            total += 1
+            stock = medicine.stock_level
+            
+            if stock == 0:
+                out_of_stock += 1
+            elif stock <= 20:
+                low_stock += 1
+                
+            if medicine.prescription_required:
+                prescription_required += 1
+                
+        return {
+            "total_skus": total,
+            "unique_medicines": total,
+            "out_of_stock": out_of_stock,
+            "low_stock": low_stock,
+            "prescription_required": prescription_required,
+            "discontinued": 0 # Not tracking yet
+        }
+    
     def get_inventory_stats(self) -> Dict[str, Any]:
         """Get inventory statistics"""
         if not self.db:
             return {}
             
         try:
-            # For large datasets, use aggregation queries. 
-            # For <1000 items, client side counting is fine.
-            docs = self.db.collection('medicines').stream()
-            
-            total = 0
-            out_of_stock = 0
-            low_stock = 0
-            prescription_required = 0
+            return self._summarize_inventory(self._load_medicines())
+        except Exception as e:
+            print(f"Error getting stats: {e}")
+            return {}
+    
+    async def get_inventory_stats_async(self) -> Dict[str, Any]:
+        """Get inventory statistics (async client)"""
+        if not self.async_db:
+            return {}
             
-            for doc in docs:
-                data = doc.to_dict()
-                total += 1
-                stock = int(data.get('stock_level', 0))
-                
-                if stock == 0:
-                    out_of_stock += 1
-                elif stock <= 20:
-                    low_stock += 1
-                    
-                if data.get('prescription_required'):
-                    prescription_required += 1
-                    
-            return {
-                "total_skus": total,
-                "unique_medicines": total,
-                "out_of_stock": out_of_stock,
-                "low_stock": low_stock,
-                "prescription_required": prescription_required,
-                "discontinued": 0 # Not tracking yet
-            }
+        try:
+            return self._summarize_inventory(await self._load_medicines_async())
         except Exception as e:
             print(f"Error getting stats: {e}")
             return {}
@@ -296,60 +502,96 @@ class DataService:
         if not self.db:
             return []
             
-        medicines = []
         try:
-            docs = self.db.collection('medicines').stream()
-            for doc in docs:
-                medicines.append(self._map_firestore_to_medicine(doc.to_dict()))
+            return list(self._load_medicines())
         except Exception as e:
             print(f"Error getting all medicines: {e}")
+            return []
+    
+    async def get_all_medicines_async(self) -> List[Medicine]:
+        """Get all medicines in inventory (async client)"""
+        if not self.async_db:
+            return []
             
-        return medicines
+        try:
+            return list(await self._load_medicines_async())
+        except Exception as e:
+            print(f"Error getting all medicines: {e}")
+            return []
+    
+    def _find_medicine_snapshot(self, medicine_name: str):
+        """
+        Current snapshot of a medicine document by exact, then case-insensitive, name.
+        medicine_name_lower is written by the CSV migration and on every stock update;
+        documents created any other way are found by the final full scan.
+        """
+        medicines_ref = self.db.collection('medicines')
+        query = (medicines_ref
+                 .where(filter=FieldFilter("medicine_name", "==", medicine_name))
+                 .limit(1))
+        docs = list(query.stream())
+        
+        if not docs:
+            # Case-insensitive match via the normalized medicine_name_lower field
+            # (indexed equality lookup instead of fetching every medicine)
+            query = (medicines_ref
+                     .where(filter=FieldFilter("medicine_name_lower", "==", medicine_name.lower().strip()))
+                     .limit(1))
+            docs = list(query.stream())
+        
+        if not docs:
+            # Documents without medicine_name_lower (added via the console/other tools)
+            target = medicine_name.lower().strip()
+            docs = [
+                doc for doc in medicines_ref.stream()
+                if str((doc.to_dict() or {}).get('medicine_name') or '').lower().strip() == target
+            ][:1]
+        
+        return docs[0] if docs else None
     
     def decrease_stock(self, medicine_name: str, quantity: int) -> bool:
         """
         Decrease stock level for a medicine.
-        Uses Firestore Transaction for atomicity.
+        Optimistic concurrency: the lookup read supplies the stock check and the
+        document's update_time; the write is a single atomic Increment guarded by
+        that update_time, retried if another writer got there first.
         """
         if not self.db:
             return False
-            
-        transaction = self.db.transaction()
         
         try:
-            # 1. Find the document ID by name
             # Ideally we should pass ID, but legacy code passes name.
-            # We search for it.
-            medicines_ref = self.db.collection('medicines')
-            query = medicines_ref.where(filter=FieldFilter("medicine_name", "==", medicine_name)).limit(1)
-            docs = list(query.stream())
-            
-            if not docs:
-                # Try case insensitive match if precise match failed? 
-                # Firestore doesn't support case-insensitive query easily. 
-                # Fail for now to enforce exact names, or fetch all (expensive).
-                print(f"Medicine not found for stock update: {medicine_name}")
-                return False
+            for _ in range(STOCK_UPDATE_ATTEMPTS):
+                snapshot = self._find_medicine_snapshot(medicine_name)
+                if snapshot is None:
+                    print(f"Medicine not found for stock update: {medicine_name}")
+                    return False
                 
-            doc_ref = docs[0].reference
-            
-            @firestore.transactional
-            def update_in_transaction(transaction, doc_ref):
-                snapshot = doc_ref.get(transaction=transaction)
                 current_stock = snapshot.get('stock_level')
-                
                 if current_stock < quantity:
                     raise ValueError(f"Insufficient stock: {current_stock} < {quantity}")
                 
-                transaction.update(doc_ref, {
-                    'stock_level': current_stock - quantity,
-                    'last_updated': firestore.SERVER_TIMESTAMP
-                })
+                try:
+                    snapshot.reference.update(
+                        {
+                            'stock_level': firestore.Increment(-quantity),
+                            # Keep the case-insensitive lookup field present on every
+                            # medicine we touch, so the next lookup is indexed
+                            'medicine_name_lower': str(snapshot.get('medicine_name') or '').lower().strip(),
+                            'last_updated': firestore.SERVER_TIMESTAMP
+                        },
+                        option=self.db.write_option(last_update_time=snapshot.update_time)
+                    )
+                except FailedPrecondition:
+                    # Changed since we read it - re-read and re-check
+                    continue
+                
+                self.invalidate_medicine_cache()
+                print(f"✅ Stock updated for {medicine_name}")
                 return True
-
-            update_in_transaction(transaction, doc_ref)
-            print(f"✅ Stock updated for {medicine_name}")
-            return True
+            
+            print(f"❌ Failed to update stock: {medicine_name} kept changing ({STOCK_UPDATE_ATTEMPTS} attempts)")
+            return False
             
         except Exception as e:
             print(f"❌ Failed to update stock: {e}")
@@ -361,8 +603,11 @@ class DataService:
             return []
             
         try:
-            # Aggregation manually
-            docs = self.db.collection('orders').stream()
+            # Aggregation manually - project only the patient fields so the
+            # (potentially large) order payloads never cross the wire
+            docs = (self.db.collection('orders')
+                    .select(PATIENT_FIELDS)
+                    .stream())
             patients_map = {}
             
             for doc in docs:
@@ -406,5 +651,10 @@ class DataService:
             return {"name": None, "phone": None}
 
 
-# Global instance
-data_service = DataService()
+@lru_cache(maxsize=1)
+def get_data_service() -> DataService:
+    """
+    Get the shared DataService instance.
+    Created on first call so importing this module doesn't connect to Firestore.
+    """
+    return DataService()
@@ -5,20 +5,101 @@ Handles server-side Firestore operations for order persistence.
 Strictly scopes all data access to user_id for security.
 """
 
+import base64
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import firebase_admin
 from firebase_admin import firestore
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Stay under Firestore's 500 writes / 10 MiB per batch commit
+BATCH_MAX_WRITES = 450
+BATCH_MAX_BYTES = 9 * 1024 * 1024
+
+# Shared pool for concurrent independent writes (kept warm across requests)
+WRITE_POOL_WORKERS = 40
+_WRITE_POOL = ThreadPoolExecutor(max_workers=WRITE_POOL_WORKERS, thread_name_prefix="firestore-write")
+
+# Projections for list reads - every order field (older docs also carry a raw `metadata` blob)
+ORDER_LIST_FIELDS = [
+    "userId", "patient_id", "orderId", "items", "itemCount", "medicine",
+    "medicine_lower", "dosage", "quantity", "supplyDays", "orderedAt",
+    "prescriptionRequired", "status", "totalAmount",
+]
+MESSAGE_FIELDS = ["sender", "text"]
+# Minimal order view for confirmations/checks (userId is needed for the ownership check)
+ORDER_SUMMARY_FIELDS = ["userId", "orderId", "medicine", "quantity"]
+
+# Per-user order index: orders_by_user/{user_id}/orders/{order_id} mirrors /orders
+# so history reads are a plain subcollection listing (no userId composite index)
+ORDERS_BY_USER_COLLECTION = "orders_by_user"
+
+# Raw order payloads live outside `orders` so normal reads never pull them
+ORDERS_RAW_COLLECTION = "orders_raw"
+
+# Shared client and collection reference, created on first use so every
+# request reuses the same gRPC channel pool
+_DB = None
+_ORDERS_COL = None
 
 # Initialize client (assumes firebase_admin.initialize_app() called in main.py)
 def get_db():
-    try:
-        return firestore.client()
-    except ValueError:
-        # If app not initialized, return None (should be handled by caller)
+    global _DB
+    if _DB is None:
+        try:
+            _DB = firestore.client()
+        except ValueError:
+            # If app not initialized, return None (should be handled by caller)
+            return None
+    return _DB
+
+def get_orders_collection():
+    """Cached reference to the 'orders' collection (None if DB unavailable)"""
+    global _ORDERS_COL
+    if _ORDERS_COL is None:
+        db = get_db()
+        if not db:
+            return None
+        _ORDERS_COL = db.collection("orders")
+    return _ORDERS_COL
+
+def get_user_orders_collection(user_id: str):
+    """Reference to a user's mirrored orders subcollection (None if DB unavailable)"""
+    db = get_db()
+    if not db:
         return None
+    return db.collection(ORDERS_BY_USER_COLLECTION).document(user_id).collection("orders")
 
-def save_order(user_id: str, order_data: Dict[str, Any]) -> bool:
+def _build_order_document(user_id: str, order_id: str, order_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepare storage data - strict schema with multi-item support"""
+    items = order_data.get("items", [])
+    first_item = items[0] if items else {}
+    
+    return {
+        "userId": user_id,  # Critical for security/filtering
+        "patient_id": order_data.get("patient_id"), # Required for DataService.get_patient_order_history
+        "orderId": order_id,
+        # Store full items array for multi-item orders
+        "items": items,
+        "itemCount": len(items),
+        # Backward-compatible single-item fields (for existing queries/displays)
+        "medicine": first_item.get("medicine_name", "Unknown"),
+        # Normalized name for indexed lookups (DataService.has_valid_prescription)
+        "medicine_lower": first_item.get("medicine_name", "Unknown").lower().strip(),
+        "dosage": first_item.get("strength", "Unknown"),
+        "quantity": int(first_item.get("quantity", 1)),
+        "supplyDays": int(first_item.get("quantity", 30)), # Simplified
+        "orderedAt": firestore.SERVER_TIMESTAMP, # Server time for truth
+        "prescriptionRequired": order_data.get("requires_prescription", False),
+        "status": "CONFIRMED",
+        "totalAmount": order_data.get("total_amount", 0.0),
+    }
+
+def save_order(user_id: str, order_data: Dict[str, Any], include_raw: bool = False) -> bool:
     """
     Save a confirmed order to Firestore.
     Path: /orders/{order_id}
@@ -26,10 +107,11 @@ def save_order(user_id: str, order_data: Dict[str, Any]) -> bool:
     Args:
         user_id: Firebase UID (SECURITY CRITICAL)
         order_data: Dictionary containing order details
+        include_raw: Also store the full payload at /orders_raw/{order_id} (debugging)
     """
-    db = get_db()
-    if not db or not user_id:
-        print(f"❌ Firestore save failed: DB={bool(db)}, UserID={bool(user_id)}")
+    orders_ref = get_orders_collection()
+    if not orders_ref or not user_id:
+        logger.error("❌ Firestore save failed: DB=%s, UserID=%s", bool(orders_ref), bool(user_id))
         return False
         
     try:
@@ -38,97 +120,237 @@ def save_order(user_id: str, order_data: Dict[str, Any]) -> bool:
         if not order_id:
             return False
             
-        doc_ref = db.collection("orders").document(order_id)
+        # Canonical doc + per-user mirror (+ raw payload), committed atomically in one RPC
+        storage_data = _build_order_document(user_id, order_id, order_data)
+        batch = get_db().batch()
+        batch.set(orders_ref.document(order_id), storage_data)
+        batch.set(get_user_orders_collection(user_id).document(order_id), storage_data)
+        if include_raw:
+            batch.set(get_db().collection(ORDERS_RAW_COLLECTION).document(order_id), {
+                "userId": user_id,
+                "orderId": order_id,
+                "order_data": order_data
+            })
+        batch.commit()
+        logger.info("✅ Order %s persisted for user %s", order_id, user_id)
+        return True
         
-        # Prepare storage data - strict schema with multi-item support
-        items = order_data.get("items", [])
-        first_item = items[0] if items else {}
+    except Exception as e:
+        logger.error("❌ Error saving order to Firestore: %s", e)
+        return False
+
+def save_orders(user_id: str, orders: List[Dict[str, Any]]) -> bool:
+    """
+    Save several confirmed orders with batched writes.
+    One commit per chunk instead of one round trip per order.
+    
+    Args:
+        user_id: Firebase UID (SECURITY CRITICAL)
+        orders: List of order dictionaries (same shape as save_order)
+    """
+    db = get_db()
+    orders_ref = get_orders_collection()
+    if not orders_ref or not user_id:
+        logger.error("❌ Firestore batch save failed: DB=%s, UserID=%s", bool(orders_ref), bool(user_id))
+        return False
+    
+    try:
+        user_orders_ref = get_user_orders_collection(user_id)
+        batch = db.batch()
+        pending_writes = 0
+        pending_bytes = 0
         
-        storage_data = {
-            "userId": user_id,  # Critical for security/filtering
-            "patient_id": order_data.get("patient_id"), # Required for DataService.get_patient_order_history
-            "orderId": order_id,
-            # Store full items array for multi-item orders
-            "items": items,
-            "itemCount": len(items),
-            # Backward-compatible single-item fields (for existing queries/displays)
-            "medicine": first_item.get("medicine_name", "Unknown"),
-            "dosage": first_item.get("strength", "Unknown"),
-            "quantity": int(first_item.get("quantity", 1)),
-            "supplyDays": int(first_item.get("quantity", 30)), # Simplified
-            "orderedAt": firestore.SERVER_TIMESTAMP, # Server time for truth
-            "prescriptionRequired": order_data.get("requires_prescription", False),
-            "status": "CONFIRMED",
-            "totalAmount": order_data.get("total_amount", 0.0),
-            "metadata": order_data # Store full blob just in case
-        }
+        for order_data in orders:
+            order_id = order_data.get("order_id")
+            if not order_id:
+                continue
+            
+            storage_data = _build_order_document(user_id, order_id, order_data)
+            doc_size = len(json.dumps(storage_data, default=str))
+            
+            # Flush before exceeding Firestore's per-batch write count / payload limits
+            # (each order is two writes: canonical doc + per-user mirror)
+            if pending_writes and (pending_writes + 2 > BATCH_MAX_WRITES or pending_bytes + 2 * doc_size > BATCH_MAX_BYTES):
+                batch.commit()
+                batch = db.batch()
+                pending_writes = 0
+                pending_bytes = 0
+            
+            batch.set(orders_ref.document(order_id), storage_data)
+            batch.set(user_orders_ref.document(order_id), storage_data)
+            pending_writes += 2
+            pending_bytes += 2 * doc_size
+        
+        if pending_writes:
+            batch.commit()
         
-        doc_ref.set(storage_data)
-        print(f"✅ Order {order_id} persisted for user {user_id}")
+        logger.info("✅ %d orders persisted for user %s", len(orders), user_id)
         return True
         
     except Exception as e:
-        print(f"❌ Error saving order to Firestore: {e}")
+        logger.error("❌ Error batch saving orders to Firestore: %s", e)
         return False
 
-def get_orders(user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+def save_orders_parallel(user_id: str, orders: List[Dict[str, Any]]) -> Dict[str, bool]:
     """
-    Get order history for a specific user.
-    Security: STRICTLY filtered by userId == user_id.
+    Save several orders concurrently, one independent write per order.
+    Unlike save_orders (atomic batches), a failed order doesn't affect the others.
+    
+    Returns:
+        Mapping of order_id -> whether that order was saved
     """
-    db = get_db()
-    if not db or not user_id:
-        return []
+    futures = {
+        _WRITE_POOL.submit(save_order, user_id, order_data): order_data["order_id"]
+        for order_data in orders
+        if order_data.get("order_id")
+    }
+    
+    results = {}
+    for future in as_completed(futures):
+        results[futures[future]] = future.result()
+    return results
+
+def _encode_order_cursor(order: Dict[str, Any]) -> str:
+    """Opaque page cursor from the last order's (orderedAt, orderId)"""
+    payload = json.dumps({"orderedAt": order["orderedAt"], "orderId": order["orderId"]})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def _decode_order_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Cursor values for start_after, matching the query's order_by fields.
+    Raises ValueError for anything that isn't a cursor we issued.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        ordered_at = datetime.fromisoformat(payload["orderedAt"])
+        order_id = payload["orderId"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid order cursor: {e}") from e
+    if not isinstance(order_id, str) or not order_id:
+        raise ValueError("Invalid order cursor: missing orderId")
+    return {
+        "orderedAt": ordered_at,
+        "__name__": order_id,  # orderId is the document ID
+    }
+
+def _fetch_orders_page(query, limit: int, start_after: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run a newest-first page query and serialize timestamps"""
+    query = (query
+             .select(ORDER_LIST_FIELDS)
+             .order_by("orderedAt", direction=firestore.Query.DESCENDING)
+             .order_by("__name__", direction=firestore.Query.DESCENDING)
+             .limit(limit))
+    if start_after:
+        query = query.start_after(start_after)
+    
+    # Convert timestamps to ISO strings for easier JSON serialization
+    # (Firestore returns DatetimeWithNanoseconds, a datetime subclass)
+    return [
+        {**data, "orderedAt": data["orderedAt"].isoformat()} if isinstance(data.get("orderedAt"), datetime) else data
+        for data in (doc.to_dict() for doc in query.stream())
+    ]
+
+def get_orders_page(user_id: str, limit: int = 5, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get one page of order history for a specific user (newest first).
+    Security: STRICTLY scoped to user_id (per-user subcollection / userId filter).
+    
+    Uses value-based cursors (start_after) rather than offsets, so each page
+    only reads `limit` documents no matter how deep the caller scrolls.
+    Reads the orders_by_user mirror; falls back to the global collection only
+    when the mirror is empty. Every writer (save_order(s), the CSV migration,
+    test scripts) writes both, but orders created before the mirror existed must
+    be copied once with scripts/backfill_orders_by_user.py - otherwise a user
+    with old orders and one new order would only see the new one.
+    
+    Returns:
+        {"orders": [...], "next_cursor": str | None}
+    
+    Raises:
+        ValueError: cursor is malformed (decoded before any query runs, so a bad
+        cursor is never mistaken for the end of the history)
+    """
+    start_after = _decode_order_cursor(cursor) if cursor else None
+    
+    orders_ref = get_orders_collection()
+    if not orders_ref or not user_id:
+        return {"orders": [], "next_cursor": None}
         
     try:
-        orders_ref = db.collection("orders")
-        query = (orders_ref
-                 .where("userId", "==", user_id)
-                 .order_by("orderedAt", direction=firestore.Query.DESCENDING)
-                 .limit(limit))
-                 
-        docs = query.stream()
+        orders = _fetch_orders_page(get_user_orders_collection(user_id), limit, start_after)
+        if not orders:
+            orders = _fetch_orders_page(orders_ref.where("userId", "==", user_id), limit, start_after)
         
-        orders = []
-        for doc in docs:
-            data = doc.to_dict()
-            # Convert timestamp to ISO string for easier JSON serialization
-            if "orderedAt" in data and hasattr(data["orderedAt"], "isoformat"):
-                data["orderedAt"] = data["orderedAt"].isoformat()
-            orders.append(data)
+        next_cursor = None
+        if len(orders) == limit and isinstance(orders[-1].get("orderedAt"), str):
+            next_cursor = _encode_order_cursor(orders[-1])
             
-        return orders
+        return {"orders": orders, "next_cursor": next_cursor}
         
     except Exception as e:
-        print(f"❌ Error fetching orders from Firestore: {e}")
-        return []
+        logger.error("❌ Error fetching orders from Firestore: %s", e)
+        return {"orders": [], "next_cursor": None}
 
-def get_conversation_history(conversation_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+def get_orders(user_id: str, limit: int = 5, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Load recent messages from a conversation for agent context.
-    Returns messages in chronological order (oldest first).
+    Get order history for a specific user.
+    Security: STRICTLY filtered by userId == user_id.
+    """
+    return get_orders_page(user_id, limit, cursor)["orders"]
+
+def get_order(user_id: str, order_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get a single order by ID with one document read.
+    Security: only returned if it belongs to user_id (mirror path, or userId check
+    on the global document).
+    
+    Args:
+        fields: Optional projection (e.g. ORDER_SUMMARY_FIELDS); must include "userId"
+    """
+    orders_ref = get_orders_collection()
+    if not orders_ref or not user_id or not order_id:
+        return None
+    
+    try:
+        doc = get_user_orders_collection(user_id).document(order_id).get(field_paths=fields)
+        if not doc.exists:
+            doc = orders_ref.document(order_id).get(field_paths=fields)
+        data = doc.to_dict() if doc.exists else None
+        if not data or data.get("userId") != user_id:
+            return None
+        if isinstance(data.get("orderedAt"), datetime):
+            data["orderedAt"] = data["orderedAt"].isoformat()
+        return data
+        
+    except Exception as e:
+        logger.error("❌ Error fetching order %s from Firestore: %s", order_id, e)
+        return None
+
+def iter_conversation_history(conversation_id: str, limit: int = 20) -> Iterator[Dict[str, Any]]:
+    """
+    Stream recent messages from a conversation for agent context.
+    Yields messages in chronological order (oldest first), so callers that
+    budget tokens can stop early without decoding the remaining documents.
     
     Args:
         conversation_id: Firestore conversation document ID
         limit: Maximum number of messages to retrieve
     
-    Returns:
-        List of message dicts with 'role' (user/assistant) and 'content' keys
+    Yields:
+        Message dicts with 'role' (user/assistant) and 'content' keys
     """
     db = get_db()
     if not db or not conversation_id:
-        return []
+        return
     
     try:
         messages_ref = db.collection("conversations").document(conversation_id).collection("messages")
         query = (messages_ref
+                 .select(MESSAGE_FIELDS)
                  .order_by("timestamp")
                  .limit(limit))
         
-        docs = query.stream()
-        
-        messages = []
-        for doc in docs:
+        for doc in query.stream():
             data = doc.to_dict()
             # Map frontend sender format to OpenAI role format
             sender = data.get("sender", "user")
@@ -136,15 +358,27 @@ def get_conversation_history(conversation_id: str, limit: int = 20) -> List[Dict
             text = data.get("text", "")
             
             if text:  # Only include non-empty messages
-                messages.append({
+                yield {
                     "role": role,
                     "content": text
-                })
-        
-        print(f"✅ Loaded {len(messages)} messages from conversation {conversation_id}")
-        return messages
+                }
         
     except Exception as e:
-        print(f"❌ Error loading conversation history: {e}")
-        return []
+        logger.error("❌ Error loading conversation history: %s", e)
 
+def get_conversation_history(conversation_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Load recent messages from a conversation for agent context.
+    Returns messages in chronological order (oldest first).
+    
+    Args:
+        conversation_id: Firestore conversation document ID
+        limit: Maximum number of messages to retrieve
+    
+    Returns:
+        List of message dicts with 'role' (user/assistant) and 'content' keys
+    """
+    # The query is already capped at `limit` documents
+    messages = list(iter_conversation_history(conversation_id, limit))
+    logger.info("✅ Loaded %d messages from conversation %s", len(messages), conversation_id)
+    return messages
@@ -0,0 +1,46 @@
+"""
+Shared HTTP Clients
+===================
+Keep-alive connection pools reused by outbound API clients, so each
+request doesn't pay for a fresh TCP/TLS handshake.
+"""
+
+import os
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# Keep-alive pool shared by every AsyncOpenAI client in services/ and agents/
+OPENAI_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=40, max_connections=100)
+
+
+@lru_cache(maxsize=1)
+def get_openai_http_client() -> httpx.AsyncClient:
+    """Shared httpx client for AsyncOpenAI(http_client=...) (created once)"""
+    return DefaultAsyncHttpxClient(limits=OPENAI_HTTP_LIMITS)
+
+
+@lru_cache(maxsize=1)
+def get_openai_client() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client on the shared pool (agents use this one instance)"""
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=get_openai_http_client()
+    )
+
+
+async def close_openai_http_client() -> None:
+    """
+    Close the shared OpenAI pool (if it was created) on the loop that used it.
+    Every cached wrapper around the pool is dropped too; callers look clients up
+    per call, so the next request builds a fresh pool instead of using a closed one.
+    """
+    from utils.tracing import create_non_traced_llm
+    
+    get_openai_client.cache_clear()
+    create_non_traced_llm.cache_clear()
+    if get_openai_http_client.cache_info().currsize:
+        http_client = get_openai_http_client()
+        get_openai_http_client.cache_clear()
+        await http_client.aclose()
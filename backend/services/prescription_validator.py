@@ -5,15 +5,74 @@ Uses GPT-4 Vision API to validate prescription images.
 Checks for doctor's name, date, medicine, and other validity criteria.
 """
 
-import os
 import base64
+import copy
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
-from openai import AsyncOpenAI
+from pydantic import ValidationError
 
+from models.schemas import PrescriptionValidationResult
+from services.http_clients import get_openai_client
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+logger = logging.getLogger(__name__)
+
+# Low-detail vision reads are a fraction of the image tokens; only a valid
+# result at or above this confidence is accepted without a high-detail re-read
+LOW_DETAIL_MIN_CONFIDENCE = 0.5
+
+# Markdown code fence around the model's JSON (```json ... ``` or ``` ... ```)
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.S)
+
+# Vision results keyed by image content hash - retried uploads of the same
+# image skip the model call. Expiry/medicine checks still run per request.
+VALIDATION_CACHE_MAX_SIZE = 1024
+VALIDATION_CACHE_TTL_SECONDS = 3600
+_validation_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def _image_cache_key(image_base64: str) -> str:
+    """Hash of the base64 payload (data-URI prefix already stripped) - no decode copy"""
+    return hashlib.blake2b(image_base64.encode("ascii", "ignore"), digest_size=16).hexdigest()
+
+
+def _sniff_image_type(image_base64: str) -> str:
+    """MIME type from the leading magic bytes (default to jpeg)"""
+    try:
+        head = base64.b64decode(image_base64[:16])
+    except ValueError:
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def _get_cached_validation(key: str) -> Optional[Dict[str, Any]]:
+    entry = _validation_cache.get(key)
+    if entry is None:
+        return None
+    cached_at, result = entry
+    if time.monotonic() - cached_at > VALIDATION_CACHE_TTL_SECONDS:
+        _validation_cache.pop(key, None)
+        return None
+    _validation_cache.move_to_end(key)
+    return copy.deepcopy(result)
+
+
+def _set_cached_validation(key: str, result: Dict[str, Any]) -> None:
+    _validation_cache[key] = (time.monotonic(), copy.deepcopy(result))
+    _validation_cache.move_to_end(key)
+    while len(_validation_cache) > VALIDATION_CACHE_MAX_SIZE:
+        _validation_cache.popitem(last=False)
 
 
 VALIDATION_PROMPT = """You are a medical prescription validator. Analyze this prescription image and extract the following information.
@@ -51,6 +110,39 @@ Respond in this exact JSON format:
 IMPORTANT: Only return the JSON object, no other text."""
 
 
+async def _run_vision_validation(data_uri: str, detail: str) -> Dict[str, Any]:
+    """One GPT-5.2 Vision call at the given detail level, parsed to a dict"""
+    response = await get_openai_client().chat.completions.create(
+        model="gpt-5.2",  # GPT-5.2 with vision capabilities
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": VALIDATION_PROMPT},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": data_uri,
+                            "detail": detail
+                        }
+                    }
+                ]
+            }
+        ],
+        max_completion_tokens=500
+    )
+    
+    # Parse response
+    response_text = response.choices[0].message.content.strip()
+    
+    # Extract JSON from response (handle potential markdown code blocks)
+    fence_match = _JSON_FENCE_RE.search(response_text)
+    payload = fence_match.group(1) if fence_match else response_text
+    
+    # Decode + validate in one pass (missing required fields fail here, not later)
+    return PrescriptionValidationResult.model_validate_json(payload).model_dump()
+
+
 async def validate_prescription_image(
     image_base64: str,
     expected_medicine: Optional[str] = None
@@ -77,46 +169,32 @@ async def validate_prescription_image(
     """
     try:
         # Clean base64 data - remove data URI prefix if present
-        if "base64," in image_base64:
-            image_base64 = image_base64.split("base64,")[1]
+        data_uri = image_base64
+        prefix, sep, payload = image_base64.partition("base64,")
+        if sep:
+            image_base64 = payload
         
-        # Determine image type (default to jpeg)
-        image_type = "image/jpeg"
+        cache_key = _image_cache_key(image_base64)
+        result = _get_cached_validation(cache_key)
+        if result is not None:
+            logger.info("♻️ Prescription validation cache hit")
+        else:
+            # Reuse an incoming image data URI as-is; otherwise build one from the sniffed type
+            if not (sep and prefix.startswith("data:image/")):
+                data_uri = f"data:{_sniff_image_type(image_base64)};base64,{image_base64}"
         
-        # Call GPT-5.2 Vision
-        response = await client.chat.completions.create(
-            model="gpt-5.2",  # GPT-5.2 with vision capabilities
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": VALIDATION_PROMPT},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{image_type};base64,{image_base64}",
-                                "detail": "high"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_completion_tokens=500
-        )
-        
-        # Parse response
-        response_text = response.choices[0].message.content.strip()
-        
-        # Extract JSON from response
-        import json
-        
-        # Handle potential markdown code blocks
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        result = json.loads(response_text)
+            # Cheap low-detail pass first. Only a confident acceptance is final -
+            # rejections (e.g. handwriting unreadable at 512px), low confidence or an
+            # unparseable answer get a high-detail re-read before anything is cached
+            try:
+                result = await _run_vision_validation(data_uri, "low")
+            except ValidationError as e:
+                logger.warning("⚠️ Low-detail prescription read unparseable, retrying at high detail: %s", e)
+                result = None
+            if not (result and result.get("is_valid")
+                    and (result.get("confidence") or 0.0) >= LOW_DETAIL_MIN_CONFIDENCE):
+                result = await _run_vision_validation(data_uri, "high")
+            _set_cached_validation(cache_key, result)
         
         # Check if prescription is expired (older than 6 months)
         is_expired = False
@@ -150,11 +228,11 @@ async def validate_prescription_image(
                 result["medicine_mismatch"] = True
                 result["expected_medicine"] = expected_medicine
         
-        print(f"✅ Prescription validation complete: valid={result['is_valid']}")
+        logger.info("✅ Prescription validation complete: valid=%s", result["is_valid"])
         return result
         
-    except json.JSONDecodeError as e:
-        print(f"❌ Failed to parse prescription validation response: {e}")
+    except ValidationError as e:
+        logger.error("❌ Failed to parse prescription validation response: %s", e)
         return {
             "is_valid": False,
             "doctor_name": None,
@@ -167,7 +245,7 @@ async def validate_prescription_image(
         }
         
     except Exception as e:
-        print(f"❌ Prescription validation error: {e}")
+        logger.error("❌ Prescription validation error: %s", e)
         return {
             "is_valid": False,
             "doctor_name": None,
@@ -5,15 +5,73 @@ Uses OpenAI Whisper for STT and OpenAI TTS for speech synthesis.
 
 import os
 import io
+import re
 import base64
-from typing import Optional, Tuple
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import AsyncIterator, Optional, Tuple
 from pathlib import Path
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from services.http_clients import get_openai_client
+
 load_dotenv()
 
+# Chunk size for streamed TTS audio
+TTS_STREAM_CHUNK_SIZE = 1 << 14
+
+# Sentence-level TTS: split points and how many clips to synthesize at once
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+TTS_SENTENCE_CONCURRENCY = 3
+
+# Synthesized audio cache keyed by (model, voice, format, speed, text).
+# In-process LRU always; set TTS_CACHE_DIR to also keep clips on disk across runs.
+TTS_CACHE_MAX_SIZE = 256
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR")
+_tts_cache: "OrderedDict[str, bytes]" = OrderedDict()
+
+
+def _tts_cache_key(model: str, voice: str, output_format: str, speed: float, text: str) -> str:
+    return hashlib.sha256(f"{model}|{voice}|{output_format}|{speed}|{text}".encode("utf-8")).hexdigest()
+
+
+def _get_cached_audio(key: str, output_format: str) -> Optional[bytes]:
+    audio = _tts_cache.get(key)
+    if audio is not None:
+        _tts_cache.move_to_end(key)
+        return audio
+    if TTS_CACHE_DIR:
+        path = Path(TTS_CACHE_DIR) / f"{key}.{output_format}"
+        if path.is_file():
+            audio = path.read_bytes()
+            _remember_audio(key, audio)
+            return audio
+    return None
+
+
+def _remember_audio(key: str, audio: bytes) -> None:
+    _tts_cache[key] = audio
+    _tts_cache.move_to_end(key)
+    while len(_tts_cache) > TTS_CACHE_MAX_SIZE:
+        _tts_cache.popitem(last=False)
+
+
+def _set_cached_audio(key: str, output_format: str, audio: bytes) -> None:
+    _remember_audio(key, audio)
+    if TTS_CACHE_DIR:
+        try:
+            cache_dir = Path(TTS_CACHE_DIR)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write then rename so readers never see a partial clip
+            tmp_path = cache_dir / f"{key}.{output_format}.tmp"
+            tmp_path.write_bytes(audio)
+            os.replace(tmp_path, cache_dir / f"{key}.{output_format}")
+        except OSError as e:
+            print(f"⚠️ Could not write TTS cache file: {e}")
+
 
 class VoiceService:
     """
@@ -29,11 +87,15 @@ class VoiceService:
     """
     
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.stt_model = "whisper-1"
         self.tts_model = "tts-1"  # or "tts-1-hd" for higher quality
         self.tts_voice = "alloy"  # Options: alloy, echo, fable, onyx, nova, shimmer
     
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Shared OpenAI client, looked up per call so a closed pool is never reused"""
+        return get_openai_client()
+    
     async def speech_to_text(
         self, 
         audio_data: bytes, 
@@ -66,7 +128,7 @@ class VoiceService:
             if language:
                 params["language"] = language
             
-            response = self.client.audio.transcriptions.create(**params)
+            response = await self.client.audio.transcriptions.create(**params)
             
             transcribed_text = response.text
             detected_language = getattr(response, 'language', None)
@@ -95,17 +157,25 @@ class VoiceService:
         Returns:
             Audio data as bytes
         """
+        voice = voice or self.tts_voice
+        speed = max(0.25, min(4.0, speed))
+        cache_key = _tts_cache_key(self.tts_model, voice, output_format, speed, text)
+        cached = _get_cached_audio(cache_key, output_format)
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.client.audio.speech.create(
+            response = await self.client.audio.speech.create(
                 model=self.tts_model,
-                voice=voice or self.tts_voice,
+                voice=voice,
                 input=text,
                 response_format=output_format,
-                speed=max(0.25, min(4.0, speed))
+                speed=speed
             )
             
             # Get audio bytes
             audio_bytes = response.content
+            _set_cached_audio(cache_key, output_format, audio_bytes)
             return audio_bytes
             
         except Exception as e:
@@ -118,6 +188,93 @@ class VoiceService:
                 )
             raise VoiceServiceError(f"Text-to-speech failed: {error_msg}")
     
+    async def stream_text_to_speech(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        output_format: str = "mp3",
+        speed: float = 1.0
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream synthesized audio as it arrives from OpenAI TTS.
+        Lets the HTTP layer forward the first bytes before synthesis finishes.
+        
+        Yields:
+            Audio chunks (TTS_STREAM_CHUNK_SIZE bytes each)
+        """
+        voice = voice or self.tts_voice
+        speed = max(0.25, min(4.0, speed))
+        cache_key = _tts_cache_key(self.tts_model, voice, output_format, speed, text)
+        cached = _get_cached_audio(cache_key, output_format)
+        if cached is not None:
+            for start in range(0, len(cached), TTS_STREAM_CHUNK_SIZE):
+                yield cached[start:start + TTS_STREAM_CHUNK_SIZE]
+            return
+        
+        try:
+            chunks = []
+            async with self.client.audio.speech.with_streaming_response.create(
+                model=self.tts_model,
+                voice=voice,
+                input=text,
+                response_format=output_format,
+                speed=speed
+            ) as response:
+                async for chunk in response.iter_bytes(TTS_STREAM_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    yield chunk
+            # Only complete clips are cached
+            _set_cached_audio(cache_key, output_format, b"".join(chunks))
+                    
+        except Exception as e:
+            raise VoiceServiceError(f"Text-to-speech streaming failed: {str(e)}")
+    
+    async def stream_text_to_speech_file(
+        self,
+        text: str,
+        output_path: str,
+        voice: Optional[str] = None,
+        output_format: str = "mp3"
+    ) -> int:
+        """
+        Stream synthesized audio straight into a file.
+        
+        Returns:
+            Number of bytes written
+        """
+        written = 0
+        with open(output_path, "wb") as f:
+            async for chunk in self.stream_text_to_speech(text, voice, output_format):
+                f.write(chunk)
+                written += len(chunk)
+        return written
+    
+    async def text_to_speech_sentences(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        max_concurrency: int = TTS_SENTENCE_CONCURRENCY
+    ) -> bytes:
+        """
+        Synthesize each sentence concurrently and join the MP3 clips in order.
+        MP3 frames concatenate cleanly, so this is mp3-only.
+        
+        Returns:
+            Audio data as bytes
+        """
+        sentences = [part for part in _SENTENCE_SPLIT_RE.split(text.strip()) if part]
+        if len(sentences) <= 1:
+            return await self.text_to_speech(text, voice)
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def synthesize(sentence: str) -> bytes:
+            async with semaphore:
+                return await self.text_to_speech(sentence, voice)
+        
+        clips = await asyncio.gather(*(synthesize(sentence) for sentence in sentences))
+        return b"".join(clips)
+    
     async def text_to_speech_base64(
         self,
         text: str,
@@ -6,9 +6,46 @@ Used primarily for order confirmations.
 """
 
 import os
+import asyncio
+import json
+import time
 from twilio.rest import Client
+from twilio.base.exceptions import TwilioRestException
 from typing import Dict, Any, Optional
 
+# Retry Twilio rate limits (HTTP 429) with exponential backoff
+WHATSAPP_MAX_ATTEMPTS = 3
+WHATSAPP_RETRY_BASE_DELAY_SECONDS = 1.0
+
+# How long shutdown waits for queued confirmations to finish sending
+WHATSAPP_DRAIN_TIMEOUT_SECONDS = 15.0
+
+# Twilio REST client, created once so its HTTP session (and TLS connection) is reused
+_TWILIO_CLIENT = None
+
+def _get_twilio_client(account_sid: str, auth_token: str) -> Client:
+    global _TWILIO_CLIENT
+    if _TWILIO_CLIENT is None:
+        _TWILIO_CLIENT = Client(account_sid, auth_token)
+    return _TWILIO_CLIENT
+
+# Order confirmation body, filled with str.format_map per send
+ORDER_CONFIRMATION_TEMPLATE = """✅ *Order Confirmed*
+
+Hello {name},
+
+Your medicine order has been successfully confirmed by Your Pharma AI.
+
+📦 *Order ID:* {order_id}
+💊 *Medicine:* {medicine_name}
+📦 *Quantity:* {quantity}
+🚚 *Delivery:* Home Delivery
+⏰ *Expected Delivery:* {delivery_estimate}
+
+Our system has validated your prescription, updated inventory, and initiated fulfillment.
+
+Thank you for choosing *Your Pharma*."""
+
 # NOTE: In sandbox mode, recipient must have joined sandbox via join code
 # Recipient must send "join <sandbox-code>" to the Twilio number first.
 
@@ -27,13 +64,14 @@ def send_order_confirmation_whatsapp(phone: str, name: str, order: Dict[str, Any
     account_sid = os.getenv("TWILIO_ACCOUNT_SID")
     auth_token = os.getenv("TWILIO_AUTH_TOKEN")
     from_number = os.getenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886")
+    content_sid = os.getenv("TWILIO_ORDER_CONTENT_SID")
     
     if not account_sid or not auth_token:
         print("⚠️ Twilio credentials missing. WhatsApp notification skipped.")
         return False
         
     try:
-        client = Client(account_sid, auth_token)
+        client = _get_twilio_client(account_sid, auth_token)
         
         # Extract order details
         order_id = order.get("order_id", "Unknown")
@@ -42,30 +80,40 @@ def send_order_confirmation_whatsapp(phone: str, name: str, order: Dict[str, Any
         quantity = item.get("quantity", 1)
         delivery_estimate = order.get("delivery_estimate", "Tomorrow by 9:00 PM")
         
-        # Format message
-        message_body = f"""✅ *Order Confirmed*
-
-Hello {name},
-
-Your medicine order has been successfully confirmed by Your Pharma AI.
-
-📦 *Order ID:* {order_id}
-💊 *Medicine:* {medicine_name}
-📦 *Quantity:* {quantity}
-🚚 *Delivery:* Home Delivery
-⏰ *Expected Delivery:* {delivery_estimate}
-
-Our system has validated your prescription, updated inventory, and initiated fulfillment.
-
-Thank you for choosing *Your Pharma*."""
+        template_vars = {
+            "name": name,
+            "order_id": order_id,
+            "medicine_name": medicine_name,
+            "quantity": quantity,
+            "delivery_estimate": delivery_estimate,
+        }
+        
+        # Twilio Content Template renders server-side when configured
+        # ({{1}}..{{5}} = name, order_id, medicine_name, quantity, delivery_estimate)
+        if content_sid:
+            message_params = {
+                "content_sid": content_sid,
+                "content_variables": json.dumps({str(i): str(v) for i, v in enumerate(template_vars.values(), start=1)})
+            }
+        else:
+            message_params = {"body": ORDER_CONFIRMATION_TEMPLATE.format_map(template_vars)}
 
         print(f"📧 Sending WhatsApp to {phone}...")
         
-        message = client.messages.create(
-            from_=from_number,
-            body=message_body,
-            to=f"whatsapp:{phone}"
-        )
+        for attempt in range(WHATSAPP_MAX_ATTEMPTS):
+            try:
+                message = client.messages.create(
+                    from_=from_number,
+                    to=f"whatsapp:{phone}",
+                    **message_params
+                )
+                break
+            except TwilioRestException as e:
+                if e.status != 429 or attempt == WHATSAPP_MAX_ATTEMPTS - 1:
+                    raise
+                delay = WHATSAPP_RETRY_BASE_DELAY_SECONDS * (2 ** attempt)
+                print(f"⏳ Twilio rate limited, retrying in {delay:.0f}s...")
+                time.sleep(delay)
         
         print(f"✅ WhatsApp sent! SID: {message.sid}")
         return True
@@ -73,3 +121,54 @@ Thank you for choosing *Your Pharma*."""
     except Exception as e:
         print(f"❌ WhatsApp failed: {e}")
         return False
+
+
+# ============ BACKGROUND SEND QUEUE ============
+
+_send_queue: Optional[asyncio.Queue] = None
+_send_worker: Optional[asyncio.Task] = None
+
+async def _whatsapp_send_worker(queue: asyncio.Queue):
+    """Single consumer - sends queued confirmations one at a time off the event loop"""
+    while True:
+        phone, name, order = await queue.get()
+        try:
+            await asyncio.to_thread(send_order_confirmation_whatsapp, phone, name, order)
+        except Exception as e:
+            # Keep the worker alive for the rest of the queue
+            print(f"❌ WhatsApp send failed: {e}")
+        finally:
+            queue.task_done()
+
+def queue_order_confirmation_whatsapp(phone: str, name: str, order: Dict[str, Any]) -> None:
+    """
+    Queue an order confirmation and return immediately.
+    Must be called from a running event loop (e.g. inside an agent/route).
+    """
+    global _send_queue, _send_worker
+    loop = asyncio.get_running_loop()
+    
+    # (Re)start the worker if this is the first send or the loop changed
+    if _send_worker is None or _send_worker.done() or _send_worker.get_loop() is not loop:
+        _send_queue = asyncio.Queue()
+        _send_worker = loop.create_task(_whatsapp_send_worker(_send_queue))
+    
+    _send_queue.put_nowait((phone, name, order))
+
+async def drain_whatsapp_queue(timeout: float = WHATSAPP_DRAIN_TIMEOUT_SECONDS) -> None:
+    """
+    Wait for queued confirmations to be sent, then stop the worker.
+    Call before the event loop shuts down (app lifespan / end of a script).
+    """
+    global _send_queue, _send_worker
+    if _send_worker is None or _send_worker.get_loop() is not asyncio.get_running_loop():
+        return
+    
+    try:
+        await asyncio.wait_for(_send_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️ WhatsApp queue not drained after {timeout:.0f}s - {_send_queue.qsize()} confirmation(s) not sent")
+    
+    _send_worker.cancel()
+    _send_queue = None
+    _send_worker = None
@@ -36,93 +36,81 @@ print("   ✓ LangSmith initialized")
 
 # Initialize data service
 print("\n[3] Loading data service...")
-from services.data_services import data_service
+from services.data_services import get_data_service
+data_service = get_data_service()
 print("   ✓ Data service loaded")
 
 
-async def test_agents():
-    results = {}
-    
-    # Test 1: PolicyAgent
-    print("\n" + "-" * 70)
-    print("[4] Testing PolicyAgent._generate_reasoning...")
-    print("-" * 70)
+async def _run_agent_test(step: int, name: str, run) -> tuple:
+    """Run one agent check, buffering its output so concurrent runs print cleanly"""
+    lines = [
+        "\n" + "-" * 70,
+        f"[{step}] Testing {name}._generate_reasoning...",
+        "-" * 70,
+    ]
     try:
-        from agents.policy_agent import PolicyAgent
-        policy = PolicyAgent()
-        policy.set_data_service(data_service)
-        
-        # Test prescription check (triggers reasoning)
-        result = await policy.check_prescription_required("Paracetamol")
-        print(f"   Agent: {result.agent}")
-        print(f"   Decision: {result.decision.value}")
-        print(f"   Reason: {result.reason}")
-        print(f"   ✓ PolicyAgent reasoning working!")
-        results["PolicyAgent"] = {"status": "✓ PASS", "reason": result.reason}
+        result = await run()
+        lines.append(f"   Agent: {result.agent}")
+        lines.append(f"   Decision: {result.decision.value}")
+        lines.append(f"   Reason: {result.reason}")
+        lines.append(f"   ✓ {name} reasoning working!")
+        status = {"status": "✓ PASS", "reason": result.reason}
     except Exception as e:
-        print(f"   ✗ PolicyAgent ERROR: {e}")
-        results["PolicyAgent"] = {"status": "✗ FAIL", "error": str(e)}
+        lines.append(f"   ✗ {name} ERROR: {e}")
+        status = {"status": "✗ FAIL", "error": str(e)}
+    return name, status, lines
+
+
+async def _run_policy():
+    from agents.policy_agent import PolicyAgent
+    policy = PolicyAgent()
+    policy.set_data_service(data_service)
     
-    # Test 2: InventoryAgent
-    print("\n" + "-" * 70)
-    print("[5] Testing InventoryAgent._generate_reasoning...")
-    print("-" * 70)
-    try:
-        from agents.inventory_agent import InventoryAgent
-        inventory = InventoryAgent()
-        inventory.set_data_service(data_service)
-        
-        result = await inventory.check_stock("Metformin", form="Tablet", dosage="500mg")
-        print(f"   Agent: {result.agent}")
-        print(f"   Decision: {result.decision.value}")
-        print(f"   Reason: {result.reason}")
-        print(f"   ✓ InventoryAgent reasoning working!")
-        results["InventoryAgent"] = {"status": "✓ PASS", "reason": result.reason}
-    except Exception as e:
-        print(f"   ✗ InventoryAgent ERROR: {e}")
-        results["InventoryAgent"] = {"status": "✗ FAIL", "error": str(e)}
+    # Test prescription check (triggers reasoning)
+    return await policy.check_prescription_required("Paracetamol")
+
+
+async def _run_inventory():
+    from agents.inventory_agent import InventoryAgent
+    inventory = InventoryAgent()
+    inventory.set_data_service(data_service)
     
-    # Test 3: RefillPredictionAgent
-    print("\n" + "-" * 70)
-    print("[6] Testing RefillPredictionAgent._generate_reasoning...")
-    print("-" * 70)
-    try:
-        from agents.refill_prediction_agent import RefillPredictionAgent
-        refill = RefillPredictionAgent()
-        refill.set_data_service(data_service)
-        
-        result = await refill.get_refill_predictions("PAT001")
-        print(f"   Agent: {result.agent}")
-        print(f"   Decision: {result.decision.value}")
-        print(f"   Reason: {result.reason}")
-        print(f"   ✓ RefillPredictionAgent reasoning working!")
-        results["RefillPredictionAgent"] = {"status": "✓ PASS", "reason": result.reason}
-    except Exception as e:
-        print(f"   ✗ RefillPredictionAgent ERROR: {e}")
-        results["RefillPredictionAgent"] = {"status": "✗ FAIL", "error": str(e)}
+    return await inventory.check_stock("Metformin", form="Tablet", dosage="500mg")
+
+
+async def _run_refill():
+    from agents.refill_prediction_agent import RefillPredictionAgent
+    refill = RefillPredictionAgent()
+    refill.set_data_service(data_service)
     
-    # Test 4: FulfillmentAgent
-    print("\n" + "-" * 70)
-    print("[7] Testing FulfillmentAgent._generate_reasoning...")
-    print("-" * 70)
-    try:
-        from agents.fulfillment_agent import FulfillmentAgent
-        fulfillment = FulfillmentAgent()
-        fulfillment.set_data_service(data_service)
-        
-        result = await fulfillment.create_order(
-            patient_id="PAT001",
-            items=[{"medicine_name": "Paracetamol", "quantity": 10, "unit_price": 5.00}],
-            delivery_type="pickup"
-        )
-        print(f"   Agent: {result.agent}")
-        print(f"   Decision: {result.decision.value}")
-        print(f"   Reason: {result.reason}")
-        print(f"   ✓ FulfillmentAgent reasoning working!")
-        results["FulfillmentAgent"] = {"status": "✓ PASS", "reason": result.reason}
-    except Exception as e:
-        print(f"   ✗ FulfillmentAgent ERROR: {e}")
-        results["FulfillmentAgent"] = {"status": "✗ FAIL", "error": str(e)}
+    return await refill.get_refill_predictions("PAT001")
+
+
+async def _run_fulfillment():
+    from agents.fulfillment_agent import FulfillmentAgent
+    fulfillment = FulfillmentAgent()
+    fulfillment.set_data_service(data_service)
+    
+    return await fulfillment.create_order(
+        patient_id="PAT001",
+        items=[{"medicine_name": "Paracetamol", "quantity": 10, "unit_price": 5.00}],
+        delivery_type="pickup"
+    )
+
+
+async def test_agents():
+    # All four agents hit OpenAI - run them concurrently
+    done = await asyncio.gather(
+        _run_agent_test(4, "PolicyAgent", _run_policy),
+        _run_agent_test(5, "InventoryAgent", _run_inventory),
+        _run_agent_test(6, "RefillPredictionAgent", _run_refill),
+        _run_agent_test(7, "FulfillmentAgent", _run_fulfillment),
+    )
+    
+    results = {}
+    for name, status, lines in done:
+        print("\n".join(lines))
+        results[name] = status
     
     return results
 
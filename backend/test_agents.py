@@ -1,24 +1,56 @@
 """
 Test Script - Verify all agents work with standardized output
 Tests all 5 agents without requiring OpenAI API calls (mock mode)
+Set LIVE_LLM=1 to run the agents against the real OpenAI API.
 """
 
 import asyncio
+import os
 import sys
 from datetime import datetime
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 # Add parent to path
 sys.path.insert(0, '.')
 
-print("=" * 60)
-print("AGENT TEST SCRIPT")
-print("=" * 60)
+# One event loop for every async step, so API clients keep their connection pools
+runner = asyncio.Runner()
+
+# Agent LLM calls are stubbed unless LIVE_LLM=1 - schema wiring doesn't need real completions
+LIVE_LLM = os.getenv("LIVE_LLM") == "1"
+MOCK_COMPLETION = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Mock reasoning for test."))])
+
+def stub_llm():
+    """Patch the shared OpenAI client's completions for the enclosed block only"""
+    if LIVE_LLM:
+        return nullcontext()
+    from services.http_clients import get_openai_client
+    return patch.object(get_openai_client().chat.completions, "create", AsyncMock(return_value=MOCK_COMPLETION))
+
+# Output is buffered per test block and written once, instead of a write per line
+_block_lines = []
+
+def out(*parts):
+    _block_lines.append(" ".join(str(p) for p in parts))
+
+def flush_block():
+    if not _block_lines:
+        return
+    sys.stdout.write("\n".join(_block_lines) + "\n")
+    sys.stdout.flush()
+    _block_lines.clear()
+
+out("=" * 60)
+out("AGENT TEST SCRIPT")
+out("=" * 60)
 
 # Test 1: Import all modules
-print("\n[1] Testing imports...")
+out("\n[1] Testing imports...")
 try:
     from models.schemas import Decision, AgentOutput, Medicine
-    print("   ✓ Schemas imported")
+    out("   ✓ Schemas imported")
     
     from agents import (
         OrchestratorAgent,
@@ -28,22 +60,28 @@ try:
         FulfillmentAgent,
         RefillPredictionAgent
     )
-    print("   ✓ All agents imported")
+    out("   ✓ All agents imported")
     
-    from services.data_services import DataService, data_service as ds
-    print("   ✓ Data service imported")
+    from services.data_services import DataService, get_data_service
+    ds = get_data_service()
+    out("   ✓ Data service imported")
 except Exception as e:
-    print(f"   ✗ Import error: {e}")
+    out(f"   ✗ Import error: {e}")
+    flush_block()
     sys.exit(1)
 
+flush_block()
+
 # Test 2: Verify Decision enum
-print("\n[2] Testing Decision enum...")
+out("\n[2] Testing Decision enum...")
 for d in Decision:
-    print(f"   - {d.value}")
-print("   ✓ Decision enum OK")
+    out(f"   - {d.value}")
+out("   ✓ Decision enum OK")
+
+flush_block()
 
 # Test 3: Test AgentOutput schema
-print("\n[3] Testing AgentOutput schema...")
+out("\n[3] Testing AgentOutput schema...")
 try:
     output = AgentOutput(
         agent="TestAgent",
@@ -53,71 +91,53 @@ try:
         message="This is a test message",
         next_agent=None
     )
-    print(f"   Agent: {output.agent}")
-    print(f"   Decision: {output.decision.value}")
-    print(f"   Reason: {output.reason}")
-    print(f"   Evidence: {output.evidence}")
-    print("   ✓ AgentOutput schema OK")
+    out(f"   Agent: {output.agent}")
+    out(f"   Decision: {output.decision.value}")
+    out(f"   Reason: {output.reason}")
+    out(f"   Evidence: {output.evidence}")
+    out("   ✓ AgentOutput schema OK")
 except Exception as e:
-    print(f"   ✗ Schema error: {e}")
+    out(f"   ✗ Schema error: {e}")
+
+flush_block()
 
 # Test 4: Test Data Service
-print("\n[4] Testing Data Service...")
+out("\n[4] Testing Data Service...")
 try:
     medicines = ds.search_medicine("paracetamol")
-    print(f"   Found {len(medicines)} medicine(s) for 'paracetamol'")
+    out(f"   Found {len(medicines)} medicine(s) for 'paracetamol'")
     if medicines:
         med = medicines[0]
-        print(f"   - {med.medicine_name} {med.strength} ({med.form})")
-    print("   ✓ Data service OK")
+        out(f"   - {med.medicine_name} {med.strength} ({med.form})")
+    out("   ✓ Data service OK")
 except Exception as e:
-    print(f"   ✗ Data service error: {e}")
+    out(f"   ✗ Data service error: {e}")
 
-# Test 5: Test InventoryAgent
-print("\n[5] Testing InventoryAgent...")
-try:
-    inventory = InventoryAgent()
-    inventory.set_data_service(ds)
-    
-    async def test_inventory():
-        result = await inventory.check_stock("paracetamol")
-        return result
-    
-    result = asyncio.run(test_inventory())
-    print(f"   Agent: {result.agent}")
-    print(f"   Decision: {result.decision.value}")
-    print(f"   Reason: {result.reason}")
-    print(f"   Evidence count: {len(result.evidence)}")
-    print("   ✓ InventoryAgent OK")
-except Exception as e:
-    print(f"   ✗ InventoryAgent error: {e}")
+flush_block()
 
-# Test 6: Test PolicyAgent
-print("\n[6] Testing PolicyAgent...")
-try:
-    policy = PolicyAgent()
-    policy.set_data_service(ds)
-    
-    async def test_policy():
-        result = await policy.check_prescription_required("paracetamol")
-        return result
-    
-    result = asyncio.run(test_policy())
-    print(f"   Agent: {result.agent}")
-    print(f"   Decision: {result.decision.value}")
-    print(f"   Reason: {result.reason}")
-    print("   ✓ PolicyAgent OK")
-except Exception as e:
-    print(f"   ✗ PolicyAgent error: {e}")
+# Tests 5-8: the agent calls are independent and I/O-bound - run them concurrently
+inventory = InventoryAgent()
+inventory.set_data_service(ds)
+policy = PolicyAgent()
+policy.set_data_service(ds)
+fulfillment = FulfillmentAgent()
+fulfillment.set_data_service(ds)
+refill = RefillPredictionAgent()
+refill.set_data_service(ds)
 
-# Test 7: Test FulfillmentAgent
-print("\n[7] Testing FulfillmentAgent...")
-try:
-    fulfillment = FulfillmentAgent()
-    fulfillment.set_data_service(ds)
+AGENT_CONCURRENCY = 4
+
+async def run_all():
+    semaphore = asyncio.Semaphore(AGENT_CONCURRENCY)
+    
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
     
-    async def test_fulfillment():
-        result = await fulfillment.create_order(
+    return await asyncio.gather(
+        bounded(inventory.check_stock("paracetamol")),
+        bounded(policy.check_prescription_required("paracetamol")),
+        bounded(fulfillment.create_order(
             patient_id="PAT001",
             items=[{
                 "medicine_id": "MED001",
@@ -126,44 +146,86 @@ try:
                 "unit_price": 5.00
             }],
             delivery_type="pickup"
-        )
-        return result
-    
-    result = asyncio.run(test_fulfillment())
-    print(f"   Agent: {result.agent}")
-    print(f"   Decision: {result.decision.value}")
-    print(f"   Reason: {result.reason}")
+        )),
+        bounded(refill.get_refill_predictions("PAT001")),
+        return_exceptions=True
+    )
+
+with stub_llm():
+    inventory_result, policy_result, fulfillment_result, refill_result = runner.run(run_all())
+
+flush_block()
+
+# Test 5: Test InventoryAgent
+out("\n[5] Testing InventoryAgent...")
+try:
+    if isinstance(inventory_result, Exception):
+        raise inventory_result
+    result = inventory_result
+    out(f"   Agent: {result.agent}")
+    out(f"   Decision: {result.decision.value}")
+    out(f"   Reason: {result.reason}")
+    out(f"   Evidence count: {len(result.evidence)}")
+    out("   ✓ InventoryAgent OK")
+except Exception as e:
+    out(f"   ✗ InventoryAgent error: {e}")
+
+flush_block()
+
+# Test 6: Test PolicyAgent
+out("\n[6] Testing PolicyAgent...")
+try:
+    if isinstance(policy_result, Exception):
+        raise policy_result
+    result = policy_result
+    out(f"   Agent: {result.agent}")
+    out(f"   Decision: {result.decision.value}")
+    out(f"   Reason: {result.reason}")
+    out("   ✓ PolicyAgent OK")
+except Exception as e:
+    out(f"   ✗ PolicyAgent error: {e}")
+
+flush_block()
+
+# Test 7: Test FulfillmentAgent
+out("\n[7] Testing FulfillmentAgent...")
+try:
+    if isinstance(fulfillment_result, Exception):
+        raise fulfillment_result
+    result = fulfillment_result
+    out(f"   Agent: {result.agent}")
+    out(f"   Decision: {result.decision.value}")
+    out(f"   Reason: {result.reason}")
     # Find order_id in evidence
     for ev in result.evidence:
         if ev.startswith("order_id="):
-            print(f"   Order ID: {ev.split('=')[1]}")
-    print("   ✓ FulfillmentAgent OK")
+            out(f"   Order ID: {ev.split('=')[1]}")
+    out("   ✓ FulfillmentAgent OK")
 except Exception as e:
-    print(f"   ✗ FulfillmentAgent error: {e}")
+    out(f"   ✗ FulfillmentAgent error: {e}")
+
+flush_block()
 
 # Test 8: Test RefillPredictionAgent
-print("\n[8] Testing RefillPredictionAgent...")
+out("\n[8] Testing RefillPredictionAgent...")
 try:
-    refill = RefillPredictionAgent()
-    refill.set_data_service(ds)
-    
-    async def test_refill():
-        result = await refill.get_refill_predictions("PAT001")
-        return result
-    
-    result = asyncio.run(test_refill())
-    print(f"   Agent: {result.agent}")
-    print(f"   Decision: {result.decision.value}")
-    print(f"   Reason: {result.reason}")
-    print("   ✓ RefillPredictionAgent OK")
+    if isinstance(refill_result, Exception):
+        raise refill_result
+    result = refill_result
+    out(f"   Agent: {result.agent}")
+    out(f"   Decision: {result.decision.value}")
+    out(f"   Reason: {result.reason}")
+    out("   ✓ RefillPredictionAgent OK")
 except Exception as e:
-    print(f"   ✗ RefillPredictionAgent error: {e}")
+    out(f"   ✗ RefillPredictionAgent error: {e}")
+
+flush_block()
 
 # Summary
-print("\n" + "=" * 60)
-print("TEST SUMMARY")
-print("=" * 60)
-print("""
+out("\n" + "=" * 60)
+out("TEST SUMMARY")
+out("=" * 60)
+out("""
 All agents emit standardized output:
 {
   "agent": "<AgentName>",
@@ -181,4 +243,8 @@ Model assignments:
 - FulfillmentAgent:      gpt-5-mini
 - RefillPredictionAgent: gpt-5-mini
 """)
-print("✅ ALL TESTS PASSED!")
+out("✅ ALL TESTS PASSED!")
+
+flush_block()
+
+runner.close()
@@ -33,7 +33,7 @@ print(f"✓ OpenAI API Key: {api_key[:15]}...")
 print("\n[1] Importing PharmacistAgent...")
 try:
     from agents import PharmacistAgent
-    from services.data_services import data_service
+    from services.data_services import get_data_service
     print("   ✓ Import successful")
 except Exception as e:
     print(f"   ✗ Import error: {e}")
@@ -4,6 +4,7 @@ Tests that multiple medicines in a single request are correctly handled.
 """
 
 import asyncio
+import operator
 import os
 import sys
 
@@ -21,36 +22,29 @@ print("\n[1] Initializing services...")
 from utils.tracing import init_langsmith
 init_langsmith()
 
-from services.data_services import data_service
-from agents.orchestrator_agent import OrchestratorAgent
+from agents.orchestrator_agent import get_orchestrator
 from models.schemas import OrchestratorRequest
 
 print("   ✓ Services initialized")
 
 
-async def test_multi_item_order():
-    """Test that multiple medicines are properly aggregated into one order."""
-    
-    orchestrator = OrchestratorAgent()
-    orchestrator.set_data_service(data_service)
-    
+# (test name, message, minimum expected preview items) - independent sessions
+ORDER_SCENARIOS = [
+    ("multi_item_request", "I want to order 5 paracetamol tablets and 3 cetirizine tablets", 2),
+    ("single_item_request", "I want to order 10 paracetamol tablets", 1),
+]
+
+# Pulls (name, quantity, unit price) out of each preview item in one call
+PREVIEW_ITEM_FIELDS = operator.attrgetter("medicine_name", "quantity", "unit_price")
+
+
+def check_order_preview(name: str, request: OrchestratorRequest, response, min_items: int) -> bool:
+    """Print one scenario's result and check its order preview."""
     print("\n" + "-" * 70)
-    print("[2] Testing Multi-Item Order Request")
+    print(f"[2] Testing {name}")
     print("-" * 70)
-    
-    # Step 1: Send a multi-medicine request
-    request = OrchestratorRequest(
-        session_id="test-multi-item-001",
-        user_message="I want to order 5 paracetamol tablets and 3 cetirizine tablets",
-        patient_id="PAT001",
-        user_name="Test User",
-        user_id="test-user-123"
-    )
-    
     print(f"   📝 Request: {request.user_message}")
     
-    response = await orchestrator.process_request(request)
-    
     print(f"\n   📊 Response:")
     print(f"      Agent Chain: {' → '.join(response.agent_chain)}")
     print(f"      Final Action: {response.final_action}")
@@ -59,33 +53,52 @@ async def test_multi_item_order():
     # Check order preview data
     if response.order_preview_data:
         preview = response.order_preview_data
+        rows = list(map(PREVIEW_ITEM_FIELDS, preview.items))
         print(f"\n   ✅ Order Preview Generated!")
         print(f"      Preview ID: {preview.preview_id}")
-        print(f"      Items Count: {len(preview.items)}")
+        print(f"      Items Count: {len(rows)}")
         
-        for i, item in enumerate(preview.items):
-            print(f"      Item {i+1}: {item.medicine_name} - Qty: {item.quantity} @ ${item.unit_price:.2f}")
+        if rows:
+            sys.stdout.write("\n".join(
+                f"      Item {i}: {name} - Qty: {qty} @ ${price:.2f}"
+                for i, (name, qty, price) in enumerate(rows, 1)
+            ) + "\n")
         
         print(f"      Total Amount: ${preview.total_amount:.2f}")
         print(f"      Requires Prescription: {preview.requires_prescription}")
         
-        if len(preview.items) >= 2:
-            print("\n   🎉 MULTI-ITEM TEST PASSED!")
-            return True, preview
+        if len(rows) >= min_items:
+            print(f"\n   🎉 {name.upper()} PASSED!")
+            return True
         else:
-            print(f"\n   ⚠️  Expected 2+ items, got {len(preview.items)}")
-            return False, preview
+            print(f"\n   ⚠️  Expected {min_items}+ items, got {len(rows)}")
+            return False
     else:
         print("\n   ❌ No order preview generated")
-        return False, None
+        return False
 
 
 async def run_tests():
-    results = {}
+    orchestrator = get_orchestrator()
     
-    # Test 1: Multi-item order request
-    passed, preview = await test_multi_item_order()
-    results["multi_item_request"] = "PASS" if passed else "FAIL"
+    requests = [
+        OrchestratorRequest(
+            session_id=f"test-{name}-001",
+            user_message=message,
+            patient_id="PAT001",
+            user_name="Test User",
+            user_id="test-user-123"
+        )
+        for name, message, _ in ORDER_SCENARIOS
+    ]
+    
+    # All scenarios run concurrently through one bounded batch
+    responses = await orchestrator.process_requests(requests)
+    
+    results = {}
+    for (name, _, min_items), request, response in zip(ORDER_SCENARIOS, requests, responses):
+        passed = check_order_preview(name, request, response, min_items)
+        results[name] = "PASS" if passed else "FAIL"
     
     # Summary
     print("\n" + "=" * 70)
@@ -5,6 +5,10 @@ import asyncio
 import os
 import sys
 
+# Hand LangSmith callbacks to a background thread so traced calls don't block on
+# trace upload; pending traces are flushed once before exit (wait_for_all_tracers)
+os.environ.setdefault("LANGCHAIN_CALLBACKS_BACKGROUND", "true")
+
 # Ensure we're in the backend directory
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -17,13 +21,17 @@ async def test_traceability():
     print("\n1. Checking imports...")
     try:
         from utils.tracing import (
-            orchestrator_span, child_agent_span, 
+            init_langsmith, orchestrator_span, child_agent_span, 
             agent_waterfall_span, get_trace_id
         )
-        from agents.orchestrator_agent import OrchestratorAgent
-        from services.data_services import data_service
+        from agents.orchestrator_agent import get_orchestrator
         from models.schemas import OrchestratorRequest
         print("   ✓ All imports successful")
+        # Tracing is opt-in per process (the app does this in its lifespan)
+        if init_langsmith():
+            print("   ✓ LangSmith tracing initialized")
+        else:
+            print("   ⚠️ LangSmith API key not set - spans will not be recorded")
     except Exception as e:
         print(f"   ✗ Import error: {e}")
         return False
@@ -31,8 +39,7 @@ async def test_traceability():
     # Step 2: Create orchestrator and set data service
     print("\n2. Initializing OrchestratorAgent...")
     try:
-        orchestrator = OrchestratorAgent()
-        orchestrator.set_data_service(data_service)
+        orchestrator = get_orchestrator()
         print("   ✓ OrchestratorAgent initialized with data service")
     except Exception as e:
         print(f"   ✗ Error: {e}")
@@ -94,4 +101,7 @@ async def test_traceability():
 
 if __name__ == "__main__":
     result = asyncio.run(test_traceability())
+    
+    from langchain_core.tracers.langchain import wait_for_all_tracers
+    wait_for_all_tracers()
     sys.exit(0 if result else 1)
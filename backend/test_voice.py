@@ -9,6 +9,12 @@ import sys
 
 sys.path.insert(0, '.')
 
+# Block-buffer the report instead of a write() per print line; flushed at the end
+sys.stdout.reconfigure(line_buffering=False, write_through=False)
+
+# One event loop for every async step, so API clients keep their connection pools
+runner = asyncio.Runner()
+
 print("=" * 60)
 print("VOICE SERVICE TEST")
 print("=" * 60)
@@ -50,28 +56,37 @@ try:
 except Exception as e:
     print(f"   ✗ Creation error: {e}")
 
-# Test 3: Test TTS (Text-to-Speech)
-print("\n[3] Testing Text-to-Speech...")
+# Tests 3 & 4: TTS and TTS Base64 are independent, so send both requests together
 test_text = "Hello! Welcome to our pharmacy. How can I help you today?"
+output_path = "test_audio_output.mp3"
 
 async def test_tts():
     try:
-        audio_bytes = await vs.text_to_speech(test_text, voice="nova")
-        return audio_bytes
+        # Stream the sample audio to disk as it is synthesized
+        return await vs.stream_text_to_speech_file(test_text, output_path, voice="nova")
+    except Exception as e:
+        return f"Error: {e}"
+
+async def test_tts_base64():
+    try:
+        b64_audio = await vs.text_to_speech_base64("Your order is ready!", voice="alloy")
+        return b64_audio
     except Exception as e:
         return f"Error: {e}"
 
+async def run_tts_probes():
+    return await asyncio.gather(test_tts(), test_tts_base64())
+
+tts_result, b64_result = runner.run(run_tts_probes())
+
+# Test 3: Test TTS (Text-to-Speech)
+print("\n[3] Testing Text-to-Speech...")
 try:
-    result = asyncio.run(test_tts())
-    if isinstance(result, bytes):
+    result = tts_result
+    if isinstance(result, int):
         print(f"   ✓ TTS successful!")
         print(f"   Text: \"{test_text}\"")
-        print(f"   Audio size: {len(result)} bytes")
-        
-        # Save sample audio
-        output_path = "test_audio_output.mp3"
-        with open(output_path, "wb") as f:
-            f.write(result)
+        print(f"   Audio size: {result} bytes")
         print(f"   Saved to: {output_path}")
     else:
         print(f"   ✗ TTS failed: {result}")
@@ -80,15 +95,8 @@ except Exception as e:
 
 # Test 4: Test TTS Base64
 print("\n[4] Testing TTS Base64 encoding...")
-async def test_tts_base64():
-    try:
-        b64_audio = await vs.text_to_speech_base64("Your order is ready!", voice="alloy")
-        return b64_audio
-    except Exception as e:
-        return f"Error: {e}"
-
 try:
-    result = asyncio.run(test_tts_base64())
+    result = b64_result
     if not result.startswith("Error"):
         print(f"   ✓ Base64 TTS successful!")
         print(f"   Base64 length: {len(result)} chars")
@@ -146,3 +154,9 @@ Usage:
   audio = await voice_service.text_to_speech("Hello!")
 """)
 print("=" * 60)
+
+# Release the shared OpenAI connection pool on the loop that opened it
+from services.http_clients import close_openai_http_client
+runner.run(close_openai_http_client())
+runner.close()
+sys.stdout.flush()
@@ -12,8 +12,13 @@ SETUP:
 
 import os
 import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
 from typing import Optional
-from functools import lru_cache
 
 import firebase_admin
 from firebase_admin import credentials, auth
@@ -26,6 +31,46 @@ security = HTTPBearer(auto_error=False)
 # Flag to track initialization
 _firebase_initialized = False
 
+# Service account key in the backend root
+SERVICE_ACCOUNT_PATH = Path(__file__).resolve().parent.parent / 'service-account.json'
+
+# Verified tokens, keyed by a blake2b digest so raw JWTs aren't kept in memory.
+# Entries live for TOKEN_CACHE_TTL_SECONDS, and never past the token's own expiry
+# (minus TOKEN_EXPIRY_MARGIN_SECONDS).
+TOKEN_CACHE_MAX_SIZE = 10_000
+TOKEN_CACHE_TTL_SECONDS = 300
+TOKEN_EXPIRY_MARGIN_SECONDS = 30
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _token_cache_key(id_token: str) -> bytes:
+    return hashlib.blake2b(id_token.encode("utf-8"), digest_size=16).digest()
+
+
+def _get_cached_user(key: bytes) -> Optional[dict]:
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if time.time() >= expires_at:
+            _token_cache.pop(key, None)
+            return None
+        _token_cache.move_to_end(key)
+        return dict(user)
+
+
+def _set_cached_user(key: bytes, user: dict, token_exp: Optional[float]) -> None:
+    expires_at = time.time() + TOKEN_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        expires_at = min(expires_at, token_exp - TOKEN_EXPIRY_MARGIN_SECONDS)
+    with _token_cache_lock:
+        _token_cache[key] = (expires_at, dict(user))
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+
 
 def init_firebase() -> bool:
     """
@@ -37,16 +82,19 @@ def init_firebase() -> bool:
     if _firebase_initialized:
         return True
     
+    # Another entry point (e.g. a script) may already have set up the default app
+    if firebase_admin._apps:
+        _firebase_initialized = True
+        return True
+    
     try:
-        # Option 1: Read from JSON file
-        service_account_path = os.path.join(
-            os.path.dirname(__file__), 
-            '..', 
-            'service-account.json'
-        )
+        # Option 1: Read from JSON file (a missing/invalid file falls through to the env var)
+        try:
+            cred = credentials.Certificate(str(SERVICE_ACCOUNT_PATH))
+        except (FileNotFoundError, ValueError):
+            cred = None
         
-        if os.path.exists(service_account_path):
-            cred = credentials.Certificate(service_account_path)
+        if cred is not None:
             firebase_admin.initialize_app(cred)
             _firebase_initialized = True
             print("✓ Firebase Admin SDK initialized (from file)")
@@ -75,6 +123,7 @@ def init_firebase() -> bool:
 def verify_firebase_token(id_token: str) -> dict:
     """
     Verify a Firebase ID token and return user info.
+    Recently verified tokens are served from an in-memory TTL cache.
     
     Returns:
         dict with 'uid', 'email', and other claims
@@ -89,15 +138,22 @@ def verify_firebase_token(id_token: str) -> dict:
                 detail="Authentication service unavailable"
             )
     
+    cache_key = _token_cache_key(id_token)
+    cached_user = _get_cached_user(cache_key)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         # Verify the token with Firebase
         decoded_token = auth.verify_id_token(id_token)
-        return {
+        user = {
             'uid': decoded_token['uid'],
             'email': decoded_token.get('email'),
             'email_verified': decoded_token.get('email_verified', False),
             'name': decoded_token.get('name'),
         }
+        _set_cached_user(cache_key, user, decoded_token.get('exp'))
+        return user
     except auth.ExpiredIdTokenError:
         raise HTTPException(
             status_code=401,
@@ -120,6 +176,18 @@ def verify_firebase_token(id_token: str) -> dict:
         )
 
 
+async def verify_firebase_token_async(id_token: str) -> dict:
+    """
+    Async verify_firebase_token for request handlers.
+    Cache hits return on the loop; a full verification (RSA signature check)
+    runs in a worker thread so it doesn't block other requests.
+    """
+    cached_user = _get_cached_user(_token_cache_key(id_token))
+    if cached_user is not None:
+        return cached_user
+    return await asyncio.to_thread(verify_firebase_token, id_token)
+
+
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Security(security)
 ) -> dict:
@@ -138,7 +206,7 @@ async def get_current_user(
         )
     
     token = credentials.credentials
-    return verify_firebase_token(token)
+    return await verify_firebase_token_async(token)
 
 
 async def get_optional_user(
@@ -152,10 +220,12 @@ async def get_optional_user(
         return None
     
     try:
-        return verify_firebase_token(credentials.credentials)
+        return await verify_firebase_token_async(credentials.credentials)
     except HTTPException:
         return None
 
 
-# Initialize on module load (optional - will init on first request if not)
-# init_firebase()
+# Initialize on module load so the first request doesn't pay for SDK setup
+# (set DEFER_FIREBASE_INIT=1 to init on first use instead)
+if os.getenv("DEFER_FIREBASE_INIT") != "1":
+    init_firebase()
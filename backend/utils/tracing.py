@@ -11,30 +11,74 @@ Each agent = ONE parent span with metadata containing:
 - evidence
 """
 
+from __future__ import annotations
+
 import os
 import time
-from functools import wraps
+import atexit
+import random
+import asyncio
+import logging
+import operator
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import lru_cache, partial, wraps
 from typing import Optional, Callable, Any, Dict, List
 from contextlib import contextmanager
 
 from langsmith import Client
 from langsmith.run_helpers import get_current_run_tree, traceable as ls_traceable
 
+from models.schemas import AgentOutput
+
+logger = logging.getLogger(__name__)
+
 # Initialize LangSmith client
 langsmith_client = None
+_flush_registered = False
 
-# Flag to disable nested tracing inside agents
-_tracing_disabled_context = False
+# Set by init_langsmith; when False the trace decorators call straight through.
+# LANGSMITH_TRACING=false turns tracing off even with an API key configured.
+_TRACING_ENABLED = False
+
+# Head-based sampling: fraction of new sessions that get a root trace
+# (LANGSMITH_SAMPLE_RATE, read in init_langsmith). Continuations follow their root.
+_TRACE_SAMPLE_RATE = 1.0
+_UNSAMPLED = ""  # session marker: the root request wasn't sampled
+
+# Flag to disable nested tracing inside agents (per task, so concurrent requests don't leak it)
+_tracing_disabled_context: ContextVar[bool] = ContextVar("tracing_disabled", default=False)
 
 # Session-based trace context storage
-# Maps session_id -> root_trace_id for unified tracing across requests
-_session_trace_context: Dict[str, str] = {}
+# Maps session_id -> (root_trace_id, last_seen) for unified tracing across requests.
+# Bounded LRU with a sliding idle TTL, so sessions that never reach CREATE_ORDER
+# (abandoned, errored, disconnected) are dropped instead of piling up.
+MAX_TRACE_SESSIONS = 10_000
+SESSION_TRACE_TTL_SECONDS = int(os.getenv("SESSION_TRACE_TTL_SECONDS", "1800"))
+_session_trace_context: "OrderedDict[str, tuple]" = OrderedDict()
+_session_trace_lock = threading.Lock()
+
+
+def _read_sample_rate() -> float:
+    """LANGSMITH_SAMPLE_RATE clamped to [0, 1]; malformed values fall back to 1.0"""
+    raw = os.getenv("LANGSMITH_SAMPLE_RATE", "1.0")
+    try:
+        rate = float(raw)
+        if rate != rate:  # NaN
+            raise ValueError(raw)
+    except ValueError:
+        logger.warning("⚠️ Invalid LANGSMITH_SAMPLE_RATE %r - tracing every session", raw)
+        return 1.0
+    return min(1.0, max(0.0, rate))
 
 
 def init_langsmith():
     """Initialize LangSmith client with API key"""
-    global langsmith_client
+    global langsmith_client, _TRACING_ENABLED, _TRACE_SAMPLE_RATE
     api_key = os.getenv("LANGCHAIN_API_KEY") or os.getenv("LANGSMITH_API_KEY")
+    if os.getenv("LANGSMITH_TRACING", "").lower() == "false":
+        api_key = None
     if api_key:
         # Enable tracing for explicit @ls_traceable decorators
         # LangChain auto-tracing is suppressed via:
@@ -42,34 +86,82 @@ def init_langsmith():
         # 2. Using callbacks=[] in create_non_traced_llm
         os.environ["LANGCHAIN_TRACING_V2"] = "true"
         os.environ["LANGCHAIN_PROJECT"] = os.getenv("LANGCHAIN_PROJECT", "agentic-pharmacy")
-        langsmith_client = Client(api_key=api_key)
+        # Keep trace uploads off the request path: runs are queued and sent in
+        # batches by a background thread, then drained once at exit
+        os.environ.setdefault("LANGCHAIN_CALLBACKS_BACKGROUND", "true")
+        langsmith_client = Client(api_key=api_key, auto_batch_tracing=True)
+        _register_trace_flush()
+        _TRACE_SAMPLE_RATE = _read_sample_rate()
+        _TRACING_ENABLED = True
         return True
     return False
 
 
+def _flush_pending_traces():
+    """Wait for queued trace uploads (atexit hook)"""
+    try:
+        from langchain_core.tracers.langchain import wait_for_all_tracers
+        wait_for_all_tracers()
+    except Exception as e:
+        print(f"⚠️ Could not flush LangSmith traces: {e}")
+
+
+def _register_trace_flush():
+    global _flush_registered
+    if not _flush_registered:
+        atexit.register(_flush_pending_traces)
+        _flush_registered = True
+
+
 def set_session_trace(session_id: str, trace_id: str) -> None:
     """Store the root trace ID for a session (for unified tracing)"""
-    _session_trace_context[session_id] = trace_id
+    now = time.monotonic()
+    with _session_trace_lock:
+        _session_trace_context[session_id] = (trace_id, now)
+        _session_trace_context.move_to_end(session_id)
+        # Oldest-touched entries sit at the front: drop the idle ones, then enforce the cap
+        while _session_trace_context:
+            oldest_id, (_, last_seen) = next(iter(_session_trace_context.items()))
+            if now - last_seen <= SESSION_TRACE_TTL_SECONDS:
+                break
+            del _session_trace_context[oldest_id]
+        while len(_session_trace_context) > MAX_TRACE_SESSIONS:
+            _session_trace_context.popitem(last=False)
 
 
 def get_session_trace(session_id: str) -> Optional[str]:
-    """Get the root trace ID for a session"""
-    return _session_trace_context.get(session_id)
+    """Get the root trace ID for a session (None if unknown, expired or unsampled)"""
+    return _lookup_session_trace(session_id) or None
+
+
+def _lookup_session_trace(session_id: str) -> Optional[str]:
+    """Raw session entry: a trace ID, _UNSAMPLED, or None"""
+    with _session_trace_lock:
+        entry = _session_trace_context.get(session_id)
+        if entry is None:
+            return None
+        trace_id, last_seen = entry
+        now = time.monotonic()
+        if now - last_seen > SESSION_TRACE_TTL_SECONDS:
+            del _session_trace_context[session_id]
+            return None
+        # Sliding TTL: an active session stays alive
+        _session_trace_context[session_id] = (trace_id, now)
+        _session_trace_context.move_to_end(session_id)
+        return trace_id
 
 
 def clear_session_trace(session_id: str) -> None:
     """Clear the trace context for a session (call when order completes)"""
-    _session_trace_context.pop(session_id, None)
+    with _session_trace_lock:
+        _session_trace_context.pop(session_id, None)
 
 
 def get_trace_id() -> Optional[str]:
     """Get the current LangSmith trace ID"""
-    try:
-        run_tree = get_current_run_tree()
-        if run_tree:
-            return str(run_tree.id)
-    except:
-        pass
+    run_tree = get_current_run_tree()
+    if run_tree is not None:
+        return str(run_tree.id)
     return None
 
 
@@ -77,29 +169,93 @@ def get_trace_id() -> Optional[str]:
 @contextmanager
 def disable_nested_tracing():
     """Context manager to disable nested tracing inside agents"""
-    global _tracing_disabled_context
-    old_value = _tracing_disabled_context
-    _tracing_disabled_context = True
+    token = _tracing_disabled_context.set(True)
     try:
         yield
     finally:
-        _tracing_disabled_context = old_value
+        _tracing_disabled_context.reset(token)
 
 
 def is_tracing_disabled() -> bool:
     """Check if nested tracing is currently disabled"""
-    return _tracing_disabled_context
+    return _tracing_disabled_context.get()
 
 
 import inspect
 
-def agent_trace(agent_name: str, model_name: str):
+# Decision fields copied from an AgentOutput-style result into span metadata
+_DECISION_FIELD_NAMES = ("decision", "reason", "evidence", "next_agent")
+_DECISION_FIELDS = operator.attrgetter(*_DECISION_FIELD_NAMES)
+_MISSING = object()
+_IS_COROUTINE = asyncio.iscoroutinefunction
+
+
+def _decision_metadata(result: Any) -> Dict[str, Any]:
+    """Extract decision/reason/evidence/next_agent from an agent result (None values skipped)"""
+    if isinstance(result, AgentOutput):
+        # Known schema - read the fields directly
+        metadata = {
+            "decision": result.decision.value,
+            "reason": result.reason,
+            "evidence": result.evidence,
+        }
+        if result.next_agent is not None:
+            metadata["next_agent"] = result.next_agent
+        return metadata
+    
+    try:
+        values = _DECISION_FIELDS(result)
+    except AttributeError:
+        # Non-AgentOutput results may carry only some (or none) of the fields
+        values = tuple(getattr(result, name, _MISSING) for name in _DECISION_FIELD_NAMES)
+    
+    metadata = {
+        name: value
+        for name, value in zip(_DECISION_FIELD_NAMES, values)
+        if value is not _MISSING and value is not None
+    }
+    if "decision" in metadata:
+        decision = metadata["decision"]
+        metadata["decision"] = str(getattr(decision, "value", decision))
+    return metadata
+
+
+def _without_call(inputs: dict) -> dict:
+    """process_inputs hook: log only the clean inputs, not the bound call (or other _ args)"""
+    return {k: v for k, v in inputs.items() if not k.startswith("_")}
+
+
+def _merge_run_metadata(run_tree: Any, data: Dict[str, Any]) -> None:
+    """Add keys to a run's metadata in place"""
+    metadata = getattr(run_tree, "metadata", None)
+    if metadata is None:
+        run_tree.metadata = data
+    else:
+        metadata.update(data)
+
+
+def _clean_inputs(sig: Optional[inspect.Signature], args: tuple, kwargs: dict) -> Dict[str, Any]:
+    """Bound call arguments (minus self) for the span's inputs"""
+    try:
+        if sig:
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return {k: v for k, v in bound.arguments.items() if k != 'self'}
+    except Exception:
+        pass
+    return {"args": [str(a) for a in args], "kwargs": kwargs}
+
+
+def agent_trace(agent_name: str, model_name: str, enabled: Optional[bool] = None):
     """
     STRICT agent tracing decorator - CHILD SPANS ONLY.
     Creates a child span under the current parent run tree.
     
     CRITICAL: This decorator only creates a span if called within
     an existing trace context (e.g., under OrchestratorAgent).
+    
+    enabled=None follows the module setting (LangSmith initialized);
+    True/False forces tracing on/off for this function.
     """
     def decorator(func: Callable) -> Callable:
         # Pre-compute signature to avoid overhead
@@ -107,125 +263,99 @@ def agent_trace(agent_name: str, model_name: str):
             sig = inspect.signature(func)
         except Exception:
             sig = None
+        
+        # Build the traced proxy once per decorated function; each call passes
+        # its bound invocation as `_call` (kept out of the logged inputs)
+        span = ls_traceable(
+            name=f"{agent_name} ({model_name})",
+            run_type="chain",
+            metadata={
+                "agent_name": agent_name,
+                "model_used": model_name,
+                "type": "agent"
+            },
+            tags=[agent_name, model_name, "agent"],
+            process_inputs=_without_call
+        )
+
+        if not _IS_COROUTINE(func):
+            @span
+            def sync_traced_proxy(trace_inputs, _call):
+                with disable_nested_tracing():
+                    return _call()
+
+            @wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                if not (_TRACING_ENABLED if enabled is None else enabled):
+                    return func(*args, **kwargs)
+                
+                # Check if we're inside a parent trace context
+                parent_run = get_current_run_tree()
+                
+                if parent_run is not None:
+                    return sync_traced_proxy(
+                        _clean_inputs(sig, args, kwargs),
+                        partial(func, *args, **kwargs)
+                    )
+                else:
+                    # No parent trace - execute without creating orphan root
+                    with disable_nested_tracing():
+                        return func(*args, **kwargs)
+            
+            return sync_wrapper
+
+        @span
+        async def async_traced_proxy(trace_inputs, _call):
+            # We accept trace_inputs just to capture them in the trace
+            # But we execute the original func with original args/kwargs
+            with disable_nested_tracing():
+                return await _call()
 
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            start_time = time.time()
+            if not (_TRACING_ENABLED if enabled is None else enabled):
+                return await func(*args, **kwargs)
+            
+            start_ns = time.perf_counter_ns()
             
             # Check if we're inside a parent trace context
             parent_run = get_current_run_tree()
             
             if parent_run is not None:
-                # Prepare clean inputs for the trace
-                try:
-                    if sig:
-                        bound = sig.bind(*args, **kwargs)
-                        bound.apply_defaults()
-                        clean_inputs = {k: v for k, v in bound.arguments.items() if k != 'self'}
-                    else:
-                        clean_inputs = {"args": [str(a) for a in args], "kwargs": kwargs}
-                except Exception:
-                    clean_inputs = {"args": [str(a) for a in args], "kwargs": kwargs}
-
                 # We have a parent - create a child span
-                @ls_traceable(
-                    name=f"{agent_name} ({model_name})",
-                    run_type="chain",
-                    metadata={
-                        "agent_name": agent_name,
-                        "model_used": model_name,
-                        "type": "agent"
-                    },
-                    tags=[agent_name, model_name, "agent"]
+                result = await async_traced_proxy(
+                    _clean_inputs(sig, args, kwargs),
+                    partial(func, *args, **kwargs)
                 )
-                async def traced_proxy(trace_inputs):
-                    # We accept trace_inputs just to capture them in the trace
-                    # But we execute the original func with original args/kwargs
-                    with disable_nested_tracing():
-                        return await func(*args, **kwargs)
-                
-                result = await traced_proxy(clean_inputs)
             else:
                 # No parent trace - execute without creating orphan root
                 with disable_nested_tracing():
                     result = await func(*args, **kwargs)
             
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             
-            # Add decision metadata to the span
-            try:
-                run_tree = get_current_run_tree()
-                if run_tree and result:
-                    metadata = {
-                        "duration_ms": duration_ms,
-                        "model_used": model_name,
-                    }
-                    
-                    # Extract decision info from AgentOutput
-                    if hasattr(result, 'decision'):
-                        decision = result.decision
-                        metadata["decision"] = decision.value if hasattr(decision, 'value') else str(decision)
-                    if hasattr(result, 'reason'):
-                        metadata["reason"] = result.reason
-                    if hasattr(result, 'evidence'):
-                        metadata["evidence"] = result.evidence
-                    if hasattr(result, 'next_agent'):
-                        metadata["next_agent"] = result.next_agent
-                    
-                    if hasattr(run_tree, 'metadata'):
-                        run_tree.metadata = {**run_tree.metadata, **metadata}
-            except:
-                pass
+            # Add decision metadata to the span (the child span has closed, so
+            # the current run tree is the parent looked up above)
+            if parent_run is not None and result:
+                # Decision info from AgentOutput is merged straight into the run
+                metadata = _decision_metadata(result)
+                metadata["duration_ms"] = duration_ms
+                metadata["model_used"] = model_name
+                _merge_run_metadata(parent_run, metadata)
             
             return result
         
-        @wraps(func)
-        def sync_wrapper(*args, **kwargs):
-            start_time = time.time()
-            
-            # Check if we're inside a parent trace context
-            parent_run = get_current_run_tree()
-            
-            if parent_run is not None:
-                # Prepare clean inputs
-                try:
-                    if sig:
-                        bound = sig.bind(*args, **kwargs)
-                        bound.apply_defaults()
-                        clean_inputs = {k: v for k, v in bound.arguments.items() if k != 'self'}
-                    else:
-                        clean_inputs = {"args": [str(a) for a in args], "kwargs": kwargs}
-                except Exception:
-                    clean_inputs = {"args": [str(a) for a in args], "kwargs": kwargs}
-
-                @ls_traceable(
-                    name=f"{agent_name} ({model_name})",
-                    run_type="chain",
-                    metadata={
-                        "agent_name": agent_name,
-                        "model_used": model_name,
-                        "type": "agent"
-                    },
-                    tags=[agent_name, model_name, "agent"]
-                )
-                def traced_proxy(trace_inputs):
-                    with disable_nested_tracing():
-                        return func(*args, **kwargs)
-                
-                return traced_proxy(clean_inputs)
-            else:
-                # No parent trace - execute without creating orphan root
-                with disable_nested_tracing():
-                    return func(*args, **kwargs)
-        
-        import asyncio
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        return sync_wrapper
+        return async_wrapper
     
     return decorator
 
 
+def _is_order_complete(result: Any) -> bool:
+    """True when the orchestrator just created the order (ends the session's trace)"""
+    final_action = getattr(result, 'final_action', None) if result else None
+    return bool(final_action) and str(final_action) == 'AgentAction.CREATE_ORDER'
+
+
 def orchestrator_trace(func: Callable) -> Callable:
     """
     ROOT trace for OrchestratorAgent.
@@ -240,9 +370,47 @@ def orchestrator_trace(func: Callable) -> Callable:
         sig = inspect.signature(func)
     except Exception:
         sig = None
+    
+    # Root and continuation spans are built once; the per-session parent_trace
+    # is attached at call time via langsmith_extra
+    @ls_traceable(
+        name="OrchestratorAgent",
+        run_type="chain",
+        metadata={
+            "role": "orchestrator",
+            "agent_name": "OrchestratorAgent",
+            "type": "continuation"
+        },
+        tags=["orchestrator", "continuation"],
+        process_inputs=_without_call
+    )
+    async def traced_continuation(trace_inputs, _call):
+        return await _call()
+    
+    @ls_traceable(
+        name="OrchestratorAgent",
+        run_type="chain",
+        metadata={
+            "role": "orchestrator",
+            "agent_name": "OrchestratorAgent",
+            "type": "root"
+        },
+        tags=["orchestrator", "root"],
+        process_inputs=_without_call
+    )
+    async def traced_root(trace_inputs, _call, _trace_ids):
+        # Record the root run's ID from inside the span - once it returns,
+        # the caller's context no longer has this run tree
+        trace_id = get_trace_id()
+        if trace_id:
+            _trace_ids.append(trace_id)
+        return await _call()
 
     @wraps(func)
     async def async_wrapper(*args, **kwargs):
+        if not _TRACING_ENABLED:
+            return await func(*args, **kwargs)
+        
         # Extract session_id from request argument
         session_id = None
         if args and len(args) > 1:
@@ -251,94 +419,73 @@ def orchestrator_trace(func: Callable) -> Callable:
                 session_id = request.session_id
         
         # Prepare clean inputs
-        try:
-            if sig:
-                bound = sig.bind(*args, **kwargs)
-                bound.apply_defaults()
-                clean_inputs = {k: v for k, v in bound.arguments.items() if k != 'self'}
-            else:
-                clean_inputs = {"args": [str(a) for a in args], "kwargs": kwargs}
-        except Exception:
-            clean_inputs = {"args": [str(a) for a in args], "kwargs": kwargs}
+        clean_inputs = _clean_inputs(sig, args, kwargs)
+        call = partial(func, *args, **kwargs)
 
         # Check if this is a continuation of an existing trace
-        existing_trace = get_session_trace(session_id) if session_id else None
+        existing_trace = _lookup_session_trace(session_id) if session_id else None
+        
+        # Sampled out (now, or at this session's root): run without any LangSmith work
+        if existing_trace == _UNSAMPLED or (
+            existing_trace is None and random.random() >= _TRACE_SAMPLE_RATE
+        ):
+            if session_id and existing_trace is None:
+                set_session_trace(session_id, _UNSAMPLED)
+            result = await func(*args, **kwargs)
+            if session_id and _is_order_complete(result):
+                clear_session_trace(session_id)
+            return result
         
         if existing_trace:
             # This is a continuation - create a child span instead of new root
-            @ls_traceable(
-                name="OrchestratorAgent",
-                run_type="chain",
-                metadata={
-                    "role": "orchestrator",
-                    "agent_name": "OrchestratorAgent",
-                    "type": "continuation",
-                    "parent_trace": existing_trace
-                },
-                tags=["orchestrator", "continuation"]
+            result = await traced_continuation(
+                clean_inputs,
+                call,
+                langsmith_extra={"metadata": {"parent_trace": existing_trace}}
             )
-            async def traced_continuation(trace_inputs):
-                return await func(*args, **kwargs)
-            
-            result = await traced_continuation(clean_inputs)
         else:
             # This is a new flow - create root trace
-            @ls_traceable(
-                name="OrchestratorAgent",
-                run_type="chain",
-                metadata={
-                    "role": "orchestrator",
-                    "agent_name": "OrchestratorAgent",
-                    "type": "root"
-                },
-                tags=["orchestrator", "root"]
-            )
-            async def traced_root(trace_inputs):
-                return await func(*args, **kwargs)
-            
-            result = await traced_root(clean_inputs)
+            trace_ids = []
+            result = await traced_root(clean_inputs, call, trace_ids)
             
             # Store the trace ID for this session for future continuations
-            if session_id:
-                trace_id = get_trace_id()
-                if trace_id:
-                    set_session_trace(session_id, trace_id)
+            if session_id and trace_ids:
+                set_session_trace(session_id, trace_ids[0])
         
         # Add routing info to trace
-        try:
-            run_tree = get_current_run_tree()
-            if run_tree and result:
-                run_tree.metadata = {
-                    **run_tree.metadata,
-                    "agent_chain": getattr(result, 'agent_chain', []),
-                    "final_action": str(getattr(result, 'final_action', 'UNKNOWN'))
-                }
-        except:
-            pass
+        run_tree = get_current_run_tree()
+        if run_tree is not None and result:
+            _merge_run_metadata(run_tree, {
+                "agent_chain": getattr(result, 'agent_chain', []),
+                "final_action": str(getattr(result, 'final_action', 'UNKNOWN'))
+            })
         
         # Clear trace context if order is complete
-        if session_id and result:
-            final_action = getattr(result, 'final_action', None)
-            if final_action and str(final_action) == 'AgentAction.CREATE_ORDER':
-                clear_session_trace(session_id)
+        if session_id and _is_order_complete(result):
+            clear_session_trace(session_id)
         
         return result
     
     return async_wrapper
 
 
+@lru_cache(maxsize=32)
 def create_non_traced_llm(model_name: str, temperature: float = 0.1):
     """
     Create a ChatOpenAI instance that does NOT create trace spans.
     Use this inside agents to prevent LLM calls from appearing in traces.
+    Memoized per (model, temperature) - agents built repeatedly share one client.
     """
     from langchain_openai import ChatOpenAI
+    from services.http_clients import get_openai_http_client
     
     # Create LLM with tracing callbacks disabled
     llm = ChatOpenAI(
         model=model_name,
         temperature=temperature,
         api_key=os.getenv("OPENAI_API_KEY"),
+        # Async calls share the keep-alive pool used by the other OpenAI clients
+        http_async_client=get_openai_http_client(),
         # Disable LangSmith callbacks for this LLM
         callbacks=[]
     )
@@ -373,20 +520,8 @@ def decision_span(agent_name: str, decision_type: str):
     return decorator
 
 
-def child_agent_span(agent_name: str, model_name: str):
-    """Alias for agent_trace for backward compatibility"""
-    return agent_trace(agent_name, model_name)
-
-
-def orchestrator_span(func: Callable) -> Callable:
-    """Alias for orchestrator_trace for backward compatibility"""
-    return orchestrator_trace(func)
-
-
-def agent_waterfall_span(agent_name: str, model_name: str):
-    """Alias for agent_trace for backward compatibility"""
-    return agent_trace(agent_name, model_name)
-
+# Aliases for backward compatibility
+child_agent_span = agent_trace
+orchestrator_span = orchestrator_trace
+agent_waterfall_span = agent_trace
 
-# Initialize on module load
-init_langsmith()
@@ -6,6 +6,9 @@ import sys
 # Setup path
 sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
+# Only the fields printed below are fetched
+INSPECT_FIELDS = ["userId", "medicine", "quantity", "orderedAt", "status"]
+
 def inspect_firestore():
     print("🔍 Inspecting Firestore Orders Collection...")
     
@@ -24,7 +27,7 @@ def inspect_firestore():
     orders_ref = db.collection("orders")
     # Try multiple queries to find the user's order
     print("Searching for specific order from screenshot: ORD-B7866524...")
-    doc = orders_ref.document("ORD-B7866524").get()
+    doc = orders_ref.document("ORD-B7866524").get(field_paths=INSPECT_FIELDS)
     
     docs = []
     if doc.exists:
@@ -33,7 +36,11 @@ def inspect_firestore():
     else:
         print("⚠️ specific order ORD-B7866524 not found by ID lookup.")
         print("Listing last 10 orders globally...")
-        docs = orders_ref.order_by("orderedAt", direction=firestore.Query.DESCENDING).limit(10).stream()
+        docs = (orders_ref
+                .select(INSPECT_FIELDS)
+                .order_by("orderedAt", direction=firestore.Query.DESCENDING)
+                .limit(10)
+                .stream())
     
     count = 0
     print("\n📦 RECENT ORDERS IN FIRESTORE:")
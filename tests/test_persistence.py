@@ -25,20 +25,27 @@ def verify_persistence():
     test_uid = "TEST_USER_VERIFY"
     test_order_id = "ORD-TEST-123"
     
+    # Canonical doc + per-user mirror, like firestore_service.save_order
     doc_ref = db.collection("orders").document(test_order_id)
-    doc_ref.set({
+    mirror_ref = db.collection("orders_by_user").document(test_uid).collection("orders").document(test_order_id)
+    order = {
         "userId": test_uid,
         "orderId": test_order_id,
         "medicine": "Test Medicine",
         "quantity": 1,
         "orderedAt": firestore.SERVER_TIMESTAMP,
         "status": "CONFIRMED"
-    })
+    }
+    batch = db.batch()
+    batch.set(doc_ref, order)
+    batch.set(mirror_ref, order)
+    batch.commit()
     print("✅ Write operation completed")
     
     # 3. Test Read (Filtered)
     orders_ref = db.collection("orders")
-    query = orders_ref.where("userId", "==", test_uid).limit(1)
+    # Only the ID matters here - project a single small field instead of the whole order
+    query = orders_ref.where("userId", "==", test_uid).select(["userId"]).limit(1)
     results = list(query.stream())
     
     if len(results) == 1 and results[0].id == test_order_id:
@@ -48,6 +55,7 @@ def verify_persistence():
         
     # 4. Cleanup
     doc_ref.delete()
+    mirror_ref.delete()
     print("✅ Cleanup completed")
 
 if __name__ == "__main__":
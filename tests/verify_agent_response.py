@@ -3,11 +3,15 @@ import os
 import sys
 from dotenv import load_dotenv
 
-# Setup path
-sys.path.append(os.path.join(os.getcwd(), 'backend'))
+# Setup path (once per process - these scripts may be imported together)
+BACKEND_PATH = os.path.join(os.getcwd(), 'backend')
+if BACKEND_PATH not in sys.path:
+    sys.path.append(BACKEND_PATH)
 
-# Load environment
-load_dotenv(os.path.join(os.getcwd(), 'backend', '.env'))
+# Load environment (skipped if another verification script already did)
+if not os.environ.get('_PHARMA_TESTS_ENV_LOADED'):
+    load_dotenv(os.path.join(BACKEND_PATH, '.env'))
+    os.environ['_PHARMA_TESTS_ENV_LOADED'] = '1'
 
 from agents.orchestrator_agent import OrchestratorAgent
 from models.schemas import OrchestratorRequest
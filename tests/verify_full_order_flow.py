@@ -3,51 +3,60 @@ import os
 import sys
 from dotenv import load_dotenv
 
-# Setup path
-sys.path.append(os.path.join(os.getcwd(), 'backend'))
+# Setup path (once per process - these scripts may be imported together)
+BACKEND_PATH = os.path.join(os.getcwd(), 'backend')
+if BACKEND_PATH not in sys.path:
+    sys.path.append(BACKEND_PATH)
 
-# Load environment
-load_dotenv(os.path.join(os.getcwd(), 'backend', '.env'))
+# Load environment (skipped if another verification script already did)
+if not os.environ.get('_PHARMA_TESTS_ENV_LOADED'):
+    load_dotenv(os.path.join(BACKEND_PATH, '.env'))
+    os.environ['_PHARMA_TESTS_ENV_LOADED'] = '1'
 
-from agents.orchestrator_agent import OrchestratorAgent
-from models.schemas import OrchestratorRequest
 import firebase_admin
 from firebase_admin import credentials, firestore
 
-from services.firestore_service import get_orders
-from services.data_services import DataService  # Import DataService class
 
-async def verify_flow():
-    print("🧪 Verifying Full Order Flow (Order -> Confirm -> Persist -> Recall)...")
-    
-    # Initialize Firebase
+def init_firebase_once() -> bool:
+    """Initialize the default Firebase app once per process"""
     try:
-        cred = credentials.Certificate('backend/service-account.json')
         if not firebase_admin._apps:
+            cred = credentials.Certificate('backend/service-account.json')
             firebase_admin.initialize_app(cred)
-        print("✅ Firebase initialized")
+        return True
     except Exception as e:
         print(f"❌ Firebase init failed: {e}")
-        return
+        return False
+
 
-    # Initialize DataService
-    data_service = DataService()
+async def verify_flow():
+    print("🧪 Verifying Full Order Flow (Order -> Confirm -> Persist -> Recall)...")
     
-    orchestrator = OrchestratorAgent()
-    orchestrator.set_data_service(data_service) # Inject Dependencies
+    # Initialize Firebase (before the services below open their Firestore client)
+    if not init_firebase_once():
+        return
+    print("✅ Firebase initialized")
+
+    from agents.orchestrator_agent import get_orchestrator
+    from models.schemas import OrchestratorRequest
+    from services.firestore_service import get_order, ORDER_SUMMARY_FIELDS
+
+    # Shared orchestrator wired to the process-wide DataService singleton
+    orchestrator = get_orchestrator()
     
     user_id = "TEST_USER_FLOW_V1"
     session_id = "sess-flow-1"
+    # Fields shared by every turn of the conversation
+    request_base = {
+        "session_id": session_id,
+        "patient_id": "msg-test-id",
+        "user_name": "Flow Tester",
+        "user_id": user_id,
+    }
     
     # 1. Place Order Request
     print("\n1️⃣ Asking for Aspirin...")
-    req1 = OrchestratorRequest(
-        session_id=session_id,
-        user_message="I want 10 Paracetamol",
-        patient_id="msg-test-id",
-        user_name="Flow Tester",
-        user_id=user_id
-    )
+    req1 = OrchestratorRequest(**request_base, user_message="I want 10 Paracetamol")
     res1 = await orchestrator.process_request(req1)
     print(f"🤖 Response: {res1.response_text}")
     print(f"🃏 UI Card: {res1.ui_card_type}")
@@ -58,13 +67,7 @@ async def verify_flow():
 
     # 2. Confirm Order
     print("\n2️⃣ Confirming Order...")
-    req2 = OrchestratorRequest(
-        session_id=session_id,
-        user_message="confirm",
-        patient_id="msg-test-id",
-        user_name="Flow Tester",
-        user_id=user_id
-    )
+    req2 = OrchestratorRequest(**request_base, user_message="confirm")
     res2 = await orchestrator.process_request(req2)
     print(f"🤖 Response: {res2.response_text}")
     print(f"📦 Order Created: {res2.order_created}")
@@ -73,31 +76,26 @@ async def verify_flow():
         print("❌ Failed to create order")
         return
 
+    # Steps 3 and 4 both only need the order written in step 2:
+    # run the Firestore check and the recall turn together
+    req3 = OrchestratorRequest(**request_base, user_message="what did I order recently?")
+    # Direct document read of the new order (not a scan of the user's history)
+    hit, res3 = await asyncio.gather(
+        asyncio.to_thread(get_order, user_id, res2.order_created, ORDER_SUMMARY_FIELDS),
+        orchestrator.process_request(req3),
+    )
+
     # 3. Verify Firestore
     print("\n3️⃣ Checking Firestore...")
-    orders = get_orders(user_id)
-    found = False
-    for o in orders:
-        if o['orderId'] == res2.order_created:
-            print(f"✅ Order {o['orderId']} found in Firestore!")
-            print(f"   Item: {o.get('medicine')} x{o.get('quantity')}")
-            found = True
-            break
-    
-    if not found:
+    if hit is not None:
+        print(f"✅ Order {hit['orderId']} found in Firestore!")
+        print(f"   Item: {hit.get('medicine')} x{hit.get('quantity')}")
+    else:
         print("❌ Order NOT found in Firestore")
         return
 
     # 4. Ask History
     print("\n4️⃣ Asking 'What did I order?'...")
-    req3 = OrchestratorRequest(
-        session_id=session_id,
-        user_message="what did I order recently?",
-        patient_id="msg-test-id",
-        user_name="Flow Tester",
-        user_id=user_id
-    )
-    res3 = await orchestrator.process_request(req3)
     print(f"🤖 Response: {res3.response_text}")
     
     if "paracetamol" in res3.response_text.lower():
@@ -105,5 +103,18 @@ async def verify_flow():
     else:
         print("⚠️ Agent might not have recalled correctly. Check response.")
 
+async def main():
+    try:
+        await verify_flow()
+    finally:
+        # Send the confirmation queued by step 2 before the loop closes
+        from services.whatsapp_service import drain_whatsapp_queue
+        await drain_whatsapp_queue()
+
 if __name__ == "__main__":
-    asyncio.run(verify_flow())
+    # Block-buffer the report instead of a write() per print line; flushed at the end
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
+    try:
+        asyncio.run(main())
+    finally:
+        sys.stdout.flush()